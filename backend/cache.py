@@ -0,0 +1,393 @@
+"""
+Post Cache - Reuse generated LinkedIn posts for identical inputs
+
+Post generation is the slowest and most expensive step of a request.
+Posts are cached by the normalized query plus a hash of the research
+data, so a repeated request skips the LLM call entirely. Keys also cover
+the system prompts, so editing a prompt never serves posts written under
+the old one.
+
+- REDIS_URL set: posts are stored as JSON under post:{key}, shared by all
+  workers and expired after POST_CACHE_TTL_SECONDS.
+- REDIS_URL unset: an in-process LRU of POST_CACHE_MAX_ENTRIES posts.
+
+SingleFlight covers the gap before a post is cached: concurrent identical
+requests share one in-flight generation instead of each calling the LLM.
+
+SemanticPostCache (opt-in via SEMANTIC_CACHE_DISTANCE) also reuses a post
+when a reworded query arrives with the same research data, by comparing
+query embeddings within a per-research bucket.
+
+The research cache sits one step earlier: research data and the tool that
+produced it are cached by research input (the query, plus conversation
+context when the agent runs) for RESEARCH_CACHE_TTL_SECONDS, so a repeated
+query skips the agent and its tool calls too. The TTL is short because web
+search results go stale. Redis keys are research:{key}.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+import orjson
+import redis.asyncio as redis
+
+from backend.models.schema import LinkedInPost
+from backend.prompts import DOCUMENT_GROUNDING_PROMPT, LINKEDIN_SYSTEM_PROMPT
+from backend.storage import get_redis
+
+T = TypeVar("T")
+
+# Cache settings
+POST_CACHE_TTL_SECONDS = int(os.getenv("POST_CACHE_TTL_SECONDS", "3600"))
+POST_CACHE_MAX_ENTRIES = 512
+
+# Research cache settings (web results go stale, so the TTL is short)
+RESEARCH_CACHE_TTL_SECONDS = int(os.getenv("RESEARCH_CACHE_TTL_SECONDS", "900"))
+RESEARCH_CACHE_MAX_ENTRIES = 256
+
+# Semantic cache settings (unset distance disables it; 0.05 ~ cosine similarity 0.95)
+SEMANTIC_CACHE_DISTANCE = os.getenv("SEMANTIC_CACHE_DISTANCE")
+SEMANTIC_BUCKET_MAX_ENTRIES = 20
+SEMANTIC_MAX_BUCKETS = 256
+EMBEDDING_CACHE_MAX_ENTRIES = 1024
+
+Embedding = List[float]
+
+# Fingerprint of the prompts posts are generated with (part of every key)
+PROMPT_FINGERPRINT = hashlib.blake2b(
+    f"{LINKEDIN_SYSTEM_PROMPT}\0{DOCUMENT_GROUNDING_PROMPT}".encode(),
+    digest_size=8
+).digest()
+
+
+def post_cache_key(query: str, research_data: str) -> str:
+    """Build the cache key for a (query, research) pair.
+
+    Args:
+        query: User query (case and surrounding whitespace are ignored)
+        research_data: Research content passed to the LLM
+
+    Returns:
+        Hex digest identifying the pair
+    """
+    normalized_query = query.strip().lower()
+    digest = hashlib.blake2b(PROMPT_FINGERPRINT, digest_size=16)
+    digest.update(normalized_query.encode())
+    digest.update(b"\0")
+    digest.update(research_data.encode())
+    return digest.hexdigest()
+
+
+def research_hash(research_data: str) -> str:
+    """Hash research data to name its semantic cache bucket."""
+    return hashlib.blake2b(PROMPT_FINGERPRINT + research_data.encode(), digest_size=16).hexdigest()
+
+
+def research_cache_key(research_input: str) -> str:
+    """Build the research cache key for the input a tool or the agent receives.
+
+    Args:
+        research_input: Query, with conversation context when the agent runs
+            (surrounding whitespace is ignored; case is kept because URLs
+            such as YouTube video IDs are case-sensitive)
+
+    Returns:
+        Hex digest identifying the input
+    """
+    return hashlib.blake2b(research_input.strip().encode(), digest_size=16).hexdigest()
+
+
+class InMemoryPostCache:
+    """Process-local LRU cache of generated posts."""
+
+    def __init__(self, max_entries: int = POST_CACHE_MAX_ENTRIES):
+        self._posts: "OrderedDict[str, LinkedInPost]" = OrderedDict()
+        self._max_entries = max_entries
+
+    async def get(self, key: str) -> Optional[LinkedInPost]:
+        """Return the cached post, or None on a miss."""
+        post = self._posts.get(key)
+        if post is not None:
+            self._posts.move_to_end(key)
+        return post
+
+    async def set(self, key: str, post: LinkedInPost) -> None:
+        """Store a post, evicting the least recently used entry when full."""
+        self._posts[key] = post
+        self._posts.move_to_end(key)
+        if len(self._posts) > self._max_entries:
+            self._posts.popitem(last=False)
+
+
+class RedisPostCache:
+    """Redis-backed post cache shared across workers."""
+
+    def __init__(self, client: redis.Redis):
+        self._redis = client
+
+    @staticmethod
+    def _key(key: str) -> str:
+        return f"post:{key}"
+
+    async def get(self, key: str) -> Optional[LinkedInPost]:
+        """Return the cached post, or None on a miss."""
+        cached = await self._redis.get(self._key(key))
+        if cached is None:
+            return None
+        return LinkedInPost.model_validate_json(cached)
+
+    async def set(self, key: str, post: LinkedInPost) -> None:
+        """Store a post with POST_CACHE_TTL_SECONDS expiry."""
+        await self._redis.set(self._key(key), post.model_dump_json(), ex=POST_CACHE_TTL_SECONDS)
+
+
+class InMemoryResearchCache:
+    """Process-local LRU of (research data, tool used), expiring after RESEARCH_CACHE_TTL_SECONDS."""
+
+    def __init__(self, max_entries: int = RESEARCH_CACHE_MAX_ENTRIES):
+        self._entries: "OrderedDict[str, Tuple[str, Optional[str], float]]" = OrderedDict()
+        self._max_entries = max_entries
+
+    async def get(self, key: str) -> Optional[Tuple[str, Optional[str]]]:
+        """Return (research data, tool used), or None on a miss."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0], entry[1]
+
+    async def set(self, key: str, data: str, tool_used: Optional[str]) -> None:
+        """Store research, evicting the least recently used entry when full."""
+        self._entries[key] = (data, tool_used, time.monotonic() + RESEARCH_CACHE_TTL_SECONDS)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+class RedisResearchCache:
+    """Redis-backed research cache shared across workers."""
+
+    def __init__(self, client: redis.Redis):
+        self._redis = client
+
+    @staticmethod
+    def _key(key: str) -> str:
+        return f"research:{key}"
+
+    async def get(self, key: str) -> Optional[Tuple[str, Optional[str]]]:
+        """Return (research data, tool used), or None on a miss."""
+        cached = await self._redis.get(self._key(key))
+        if cached is None:
+            return None
+        entry = orjson.loads(cached)
+        return entry["data"], entry["tool_used"]
+
+    async def set(self, key: str, data: str, tool_used: Optional[str]) -> None:
+        """Store research with RESEARCH_CACHE_TTL_SECONDS expiry."""
+        await self._redis.set(
+            self._key(key),
+            orjson.dumps({"data": data, "tool_used": tool_used}),
+            ex=RESEARCH_CACHE_TTL_SECONDS
+        )
+
+
+class SingleFlight:
+    """Run at most one coroutine per key; concurrent callers await the same result.
+    
+    Scope is the current process. Once the shared task finishes (or fails),
+    the key is released and the next call starts a fresh run.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """Return the result of factory(), sharing an in-flight run for `key`.
+
+        Args:
+            key: Identity of the work (e.g. a post cache key)
+            factory: Called only if no run for `key` is in flight
+
+        Returns:
+            The shared result
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+
+        # Shield so one client disconnecting doesn't cancel the run for the others
+        return await asyncio.shield(task)
+
+
+class InMemorySemanticBuckets:
+    """Process-local (embedding, post) entries per research hash, LRU by bucket.
+
+    Like the Redis buckets, a bucket expires POST_CACHE_TTL_SECONDS after
+    its last add.
+    """
+
+    def __init__(self, max_buckets: int = SEMANTIC_MAX_BUCKETS):
+        self._buckets: "OrderedDict[str, Deque[Tuple[Embedding, LinkedInPost]]]" = OrderedDict()
+        self._expires_at: Dict[str, float] = {}
+        self._max_buckets = max_buckets
+
+    async def entries(self, bucket: str) -> List[Tuple[Embedding, LinkedInPost]]:
+        """Return the entries of a bucket (empty if unknown or expired)."""
+        entries = self._buckets.get(bucket)
+        if entries is None:
+            return []
+        if self._expires_at[bucket] <= time.monotonic():
+            del self._buckets[bucket], self._expires_at[bucket]
+            return []
+        self._buckets.move_to_end(bucket)
+        return list(entries)
+
+    async def add(self, bucket: str, embedding: Embedding, post: LinkedInPost) -> None:
+        """Add an entry and refresh the bucket's TTL, evicting the oldest entry or bucket when full."""
+        entries = self._buckets.get(bucket)
+        if entries is None:
+            entries = self._buckets[bucket] = deque(maxlen=SEMANTIC_BUCKET_MAX_ENTRIES)
+        entries.append((embedding, post))
+        self._expires_at[bucket] = time.monotonic() + POST_CACHE_TTL_SECONDS
+        self._buckets.move_to_end(bucket)
+        if len(self._buckets) > self._max_buckets:
+            evicted, _ = self._buckets.popitem(last=False)
+            del self._expires_at[evicted]
+
+
+class RedisSemanticBuckets:
+    """Redis list per research hash (semcache:{hash}) shared across workers."""
+
+    def __init__(self, client: redis.Redis):
+        self._redis = client
+
+    @staticmethod
+    def _key(bucket: str) -> str:
+        return f"semcache:{bucket}"
+
+    async def entries(self, bucket: str) -> List[Tuple[Embedding, LinkedInPost]]:
+        """Return the entries of a bucket (empty if unknown)."""
+        raw_entries = await self._redis.lrange(self._key(bucket), 0, -1)
+        entries = []
+        for raw in raw_entries:
+            entry = orjson.loads(raw)
+            entries.append((entry["embedding"], LinkedInPost.model_validate(entry["post"])))
+        return entries
+
+    async def add(self, bucket: str, embedding: Embedding, post: LinkedInPost) -> None:
+        """Add an entry, capping the bucket length and refreshing its TTL."""
+        key = self._key(bucket)
+        entry = orjson.dumps({"embedding": embedding, "post": post.model_dump()})
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.rpush(key, entry)
+        pipe.ltrim(key, -SEMANTIC_BUCKET_MAX_ENTRIES, -1)
+        pipe.expire(key, POST_CACHE_TTL_SECONDS)
+        await pipe.execute()
+
+
+class SemanticPostCache:
+    """Reuse a post for a reworded query over the same research data.
+    
+    Entries are bucketed by research hash, so only queries against
+    identical research are ever compared. Within a bucket, the closest
+    query embedding wins if its cosine distance is <= max_distance.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[str], Awaitable[Embedding]],
+        buckets,
+        max_distance: float
+    ):
+        self._embed = embed
+        self._buckets = buckets
+        self._max_distance = max_distance
+        self._embeddings: "OrderedDict[str, Embedding]" = OrderedDict()
+
+    async def _query_embedding(self, query: str) -> Embedding:
+        """Embed a normalized query, reusing recent embeddings (get + set embed once)."""
+        normalized_query = query.strip().lower()
+        embedding = self._embeddings.get(normalized_query)
+        if embedding is None:
+            embedding = await self._embed(normalized_query)
+            self._embeddings[normalized_query] = embedding
+            if len(self._embeddings) > EMBEDDING_CACHE_MAX_ENTRIES:
+                self._embeddings.popitem(last=False)
+        else:
+            self._embeddings.move_to_end(normalized_query)
+        return embedding
+
+    async def get(self, query: str, research_data: str) -> Optional[LinkedInPost]:
+        """Return the post of the closest cached query, or None on a miss."""
+        entries = await self._buckets.entries(research_hash(research_data))
+        if not entries:
+            return None
+
+        embedding = await self._query_embedding(query)
+        best_distance, best_post = min(
+            ((1.0 - _cosine_similarity(embedding, cached), post) for cached, post in entries),
+            key=lambda candidate: candidate[0]
+        )
+        return best_post if best_distance <= self._max_distance else None
+
+    async def set(self, query: str, research_data: str, post: LinkedInPost) -> None:
+        """Store a post under the query's embedding."""
+        embedding = await self._query_embedding(query)
+        await self._buckets.add(research_hash(research_data), embedding, post)
+
+
+def _cosine_similarity(a: Embedding, b: Embedding) -> float:
+    """Cosine similarity of two vectors."""
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = (sum(x * x for x in a) * sum(y * y for y in b)) ** 0.5
+    return dot / norm if norm else 0.0
+
+
+def create_post_cache():
+    """Create the post cache configured by REDIS_URL.
+
+    Returns:
+        RedisPostCache if REDIS_URL is set, otherwise InMemoryPostCache
+    """
+    client = get_redis()
+    if client is not None:
+        return RedisPostCache(client)
+    return InMemoryPostCache()
+
+
+def create_research_cache():
+    """Create the research cache configured by REDIS_URL.
+
+    Returns:
+        RedisResearchCache if REDIS_URL is set, otherwise InMemoryResearchCache
+    """
+    client = get_redis()
+    if client is not None:
+        return RedisResearchCache(client)
+    return InMemoryResearchCache()
+
+
+def create_semantic_cache(embed: Callable[[str], Awaitable[Embedding]]) -> Optional[SemanticPostCache]:
+    """Create the semantic post cache if SEMANTIC_CACHE_DISTANCE is set.
+
+    Args:
+        embed: Async function returning the embedding of a text
+
+    Returns:
+        SemanticPostCache backed by Redis or process memory, or None when disabled
+    """
+    if not SEMANTIC_CACHE_DISTANCE:
+        return None
+
+    client = get_redis()
+    buckets = RedisSemanticBuckets(client) if client is not None else InMemorySemanticBuckets()
+    return SemanticPostCache(embed, buckets, float(SEMANTIC_CACHE_DISTANCE))
@@ -0,0 +1,97 @@
+"""
+HTTP Client - Shared connection pool for outbound API calls
+
+A single httpx.AsyncClient (HTTP/2 + keep-alive) reused by every tool
+and endpoint that calls an external API. Repeat calls to the same host
+skip the TCP + TLS handshake and multiplex over one connection.
+
+OpenAI gets one shared AsyncOpenAI client with its own HTTP/2 pool, used
+for post generation, embeddings, Batch API calls, Whisper transcription
+and the research agent alike.
+
+Both are created lazily on first use and closed by the FastAPI lifespan
+handler in main.py.
+"""
+
+import asyncio
+import os
+from typing import Iterable, Optional
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+# Connection pool settings
+HTTP_LIMITS = httpx.Limits(
+    max_keepalive_connections=50,
+    max_connections=100,
+    keepalive_expiry=60
+)
+HTTP_TIMEOUT = httpx.Timeout(30.0, connect=3.0, read=15.0)
+
+# OpenAI connection pool settings
+OPENAI_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+_client: Optional[httpx.AsyncClient] = None
+_openai_client: Optional[AsyncOpenAI] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared HTTP/2 client, creating it on first use."""
+    global _client
+
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            limits=HTTP_LIMITS,
+            timeout=HTTP_TIMEOUT
+        )
+
+    return _client
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """Return the shared AsyncOpenAI client, creating it on first use."""
+    global _openai_client
+
+    if _openai_client is None or _openai_client.is_closed():
+        _openai_client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=DefaultAsyncHttpxClient(http2=True, limits=OPENAI_LIMITS)
+        )
+
+    return _openai_client
+
+
+async def close_http_client() -> None:
+    """Close the shared client and release its pooled connections."""
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def close_openai_client() -> None:
+    """Close the shared OpenAI client and release its pooled connections."""
+    global _openai_client
+
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
+
+
+async def warm_up_connections(urls: Iterable[str], timeout: float = 2.0) -> None:
+    """Open pooled connections to API hosts ahead of the first request.
+    
+    Best effort: failures are ignored, since the real request will simply
+    open its own connection.
+    
+    Args:
+        urls: Any URL on each host to connect to
+        timeout: Per-request timeout in seconds
+    """
+    client = get_http_client()
+    await asyncio.gather(
+        *(client.head(url, timeout=timeout) for url in urls),
+        return_exceptions=True
+    )
@@ -14,46 +14,99 @@ Architecture:
 Tools: web_search (Tavily + Exa) and youtube_transcribe (Whisper API)
 """
 
+import asyncio
+import hashlib
+import io
+import json
 import os
+import re
 import uuid
-from typing import Dict, List, Optional
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, replace
+from functools import partial
+from typing import AsyncIterator, Awaitable, BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
-from openai import OpenAI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, RedirectResponse, Response, StreamingResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+import openai
 import instructor
 import logfire
-import httpx
-from agents import Agent, Runner
-
+from agents import Agent, ModelSettings, Runner, set_default_openai_client
+from uuid_utils import uuid7
+
+from backend.cache import (
+    SingleFlight,
+    create_post_cache,
+    create_research_cache,
+    create_semantic_cache,
+    post_cache_key,
+    research_cache_key
+)
+from backend.http_client import (
+    close_http_client,
+    close_openai_client,
+    get_http_client,
+    get_openai_client,
+    warm_up_connections
+)
 from backend.models.schema import (
     LinkedInPostRequest,
     LinkedInPostResponse,
     LinkedInPost,
+    LinkedInPostDraft,
+    BatchPostRequest,
+    BatchPostResult,
+    BatchJobResponse,
     DocumentMetadata,
     DocumentContent
 )
-from backend.prompts import LINKEDIN_SYSTEM_PROMPT, DOCUMENT_GROUNDING_PROMPT
-from backend.tools.web_search import web_search
-from backend.tools.youtube_transcribe import youtube_transcribe
-from backend.tools.file_search.tool import file_search, set_document_store
+from backend.prompts import LINKEDIN_SYSTEM_PROMPT, DOCUMENT_SYSTEM_PROMPT
+from backend.storage import (
+    CONTEXT_MESSAGES,
+    LINKEDIN_SESSION_TTL_SECONDS,
+    create_conversation_store,
+    create_document_store,
+    create_linkedin_session_store,
+    close_redis
+)
+from backend.tools.web_search import search_web, web_search, TAVILY_SEARCH_URL, EXA_BASE_URL
+from backend.tools.youtube_transcribe import transcribe_video, youtube_transcribe
+from backend.tools.file_search.tool import file_search, search_document, set_document_store
 from backend.tools.file_search.rag import create_vector_store
+from backend.tools.file_search.config import MAX_FILE_SIZE_BYTES
 from backend.tools.file_search.document_processor import (
-    extract_text_from_pdf,
+    extract_text_with_token_count,
     count_tokens,
     validate_file_size,
-    validate_token_count,
     determine_tier,
     truncate_text
 )
 
+T = TypeVar("T")
+
 load_dotenv()
 
-# In-memory storage (use Redis/DB for production)
-conversation_store: Dict[str, List[Dict[str, str]]] = {}
-document_store: Dict[str, DocumentContent] = {}
-linkedin_tokens: Dict[str, str] = {}  # session_id -> access_token
+# Conversation history (Redis when REDIS_URL is set, otherwise in-memory)
+conversation_store = create_conversation_store()
+
+# Generated post cache keyed by (query, research data)
+post_cache = create_post_cache()
+
+# Research data by query/agent input, so repeated queries skip tool calls (short TTL)
+research_cache = create_research_cache()
+
+# Identical concurrent requests share one in-flight generation
+post_generations = SingleFlight()
+
+# Uploaded documents (Redis when REDIS_URL is set, otherwise in-memory)
+document_store = create_document_store()
+
+# LinkedIn logins: session_id -> {access_token, person_urn} (Redis when REDIS_URL is set)
+linkedin_sessions = create_linkedin_session_store()
 
 # Initialize document store reference in file_search tool
 set_document_store(document_store)
@@ -64,20 +117,175 @@ LINKEDIN_CLIENT_SECRET = os.getenv("LINKEDIN_CLIENT_SECRET", "")
 LINKEDIN_REDIRECT_URI = os.getenv("LINKEDIN_REDIRECT_URI", "http://localhost:8000/api/linkedin/callback")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
 
+# Phrases tools use for limit violations (video too long, document too large, ...)
+# Compiled once; case-insensitive search avoids lowercasing large tool outputs
+TOOL_ERROR_PATTERN = re.compile(r"too long|maximum allowed|exceeds limit", re.IGNORECASE)
+
+# Phrases the LLM uses when a topic is missing from the uploaded document.
+# Post content needs the stricter "... in" forms, since a valid post can say
+# "employees are not covered by a pension plan"; error text uses the looser ones.
+NOT_IN_DOCUMENT_PATTERN = re.compile(r"cannot create|not covered|not present", re.IGNORECASE)
+NOT_IN_DOCUMENT_CONTENT_PATTERN = re.compile(r"cannot create|not covered in|not present in", re.IGNORECASE)
+
+# Refinement requests skip the agent and rewrite the previous post directly.
+# Only imperative phrasings at the start of the message count ("make it
+# shorter", "rewrite it", "remove the emojis", "add more stats"); a topic
+# that merely contains such a word ("how to remove bias from hiring") and
+# anything ambiguous is left to the agent. The React client prefixes every
+# message with [file_id: ...] once a PDF is uploaded, so that prefix is
+# ignored here.
+FILE_ID_PREFIX_PATTERN = re.compile(r"^\s*\[file_id:\s*[^\]]*\]\s*")
+URL_PATTERN = re.compile(r"https?://|www\.|youtu\.?be", re.IGNORECASE)
+REFINEMENT_VERBS = r"(?:shorten|lengthen|condense|tighten|rewrite|rephrase|refine|polish|simplify|redo)"
+# Parts of a post that "remove ..." / "add ..." refinements name
+POST_PARTS = (
+    r"(?:emojis?|hashtags?|stats|statistics|examples?|bullet\s+points|bullets|line\s+breaks|"
+    r"cta|call\s+to\s+action|question|hook|jargon|humou?r|personality)"
+)
+# ... and what must follow them: the end of the message or a reference to the
+# post, so topics like "Add humor to your presentations" aren't refinements
+POST_PART_END = r"(?:\s+(?:from|in|to)\s+(?:it|this|the\s+post))?(?:\s+please)?\W*$"
+REFINEMENT_PATTERN = re.compile(
+    r"^(?:(?:please|now|ok(?:ay)?|can\s+you|could\s+you)[,\s]+)*(?:"
+    # "Make it count: ..." / "Keep it simple: ..." are titles, not instructions
+    r"(?:make|keep)\s+(?:it|this|the\s+post)\b(?![^:]*:)"
+    rf"|{REFINEMENT_VERBS}\s+(?:it|this|that|the\s+(?:post|draft|hook|intro|ending))\b"
+    rf"|{REFINEMENT_VERBS}\W*$"
+    r"|(?:change|adjust|switch)\s+the\s+tone\b"
+    r"|(?:remove|drop|delete|cut|take\s+out|get\s+rid\s+of)\s+(?:the\s+|all\s+(?:the\s+)?|some\s+of\s+the\s+)?"
+    rf"{POST_PARTS}{POST_PART_END}"
+    rf"|(?:add|include)\s+(?:more\s+|some\s+|a\s+few\s+|an?\s+)?{POST_PARTS}{POST_PART_END}"
+    rf"|use\s+(?:more|fewer|less|no)\s+{POST_PARTS}{POST_PART_END}"
+    r")",
+    re.IGNORECASE
+)
+MAX_REFINEMENT_QUERY_CHARS = 200
+
+# Unambiguous tool requests are routed in Python instead of by the agent:
+# "[file_id: X] topic" -> file_search, a YouTube video URL -> youtube_transcribe
+FILE_ID_QUERY_PATTERN = re.compile(r"^\s*\[file_id:\s*([\w-]+)\s*\]\s*(\S.*)", re.DOTALL)
+YOUTUBE_URL_PATTERN = re.compile(
+    r"https?://(?:www\.|m\.)?(?:youtube\.com/(?:watch\?\S*?v=|shorts/)|youtu\.be/)[\w-]{11}\S*",
+    re.IGNORECASE
+)
+
+# Research token budgets tried, in order, after a context-length error
+# (research is already capped at 15k tokens for the first attempt)
+CONTEXT_RETRY_TOKENS = (8_000, 4_000)
+CONTEXT_LENGTH_ERROR_PATTERN = re.compile(r"context_length_exceeded|context window", re.IGNORECASE)
+
+# Post generation model (streamed, direct and Batch API requests)
+POST_MODEL = "gpt-4o-mini"
+
+# Sampling for new posts; refinements use temperature 0 with a fixed seed
+POST_TEMPERATURE = 0.7
+REFINEMENT_SEED = 42
+
+# Upper bound for one agent run (tool calls included); YouTube transcription is the slowest path
+AGENT_TIMEOUT_SECONDS = float(os.getenv("AGENT_TIMEOUT_SECONDS", "90"))
+
+# Batch API: research for queued queries runs a few agents at a time
+BATCH_RESEARCH_CONCURRENCY = 5
+
+# JSON schema output for Batch API requests (Instructor isn't in that loop;
+# results are validated against LinkedInPost when the batch is collected)
+POST_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "LinkedInPost", "schema": LinkedInPost.model_json_schema()}
+}
+
+# Uploads whose Content-Length exceeds the PDF limit plus multipart overhead
+# are rejected before the body is read
+UPLOAD_PATH = "/api/upload-document"
+MAX_UPLOAD_REQUEST_BYTES = MAX_FILE_SIZE_BYTES + 64 * 1024
+
+# Next-step message shown after an upload, by processing tier
+UPLOAD_MESSAGES = {
+    "direct": "Document uploaded! What specific topic or angle would you like to create a LinkedIn post about?",
+    "rag": "Large document uploaded and indexed! What specific topic or angle would you like to create a LinkedIn post about?"
+}
+
+# Tracing: errors and slow (>5s) traces are always kept; other traces are
+# sampled at LOGFIRE_SAMPLE_RATE. The health check and OAuth redirect aren't traced.
+LOGFIRE_SAMPLE_RATE = float(os.getenv("LOGFIRE_SAMPLE_RATE", "1.0"))
+LOGFIRE_EXCLUDED_URLS = r"^https?://[^/]+/$,/api/linkedin/callback"
+
 # Configure Logfire for tracing
-logfire.configure()
+logfire.configure(
+    sampling=logfire.SamplingOptions.level_or_duration(background_rate=LOGFIRE_SAMPLE_RATE)
+)
 logfire.instrument_openai()
 logfire.instrument_openai_agents()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan - warm caches on startup, release shared connection pools on shutdown."""
+    await _warm_up()
+    yield
+    await close_http_client()
+    await close_openai_client()
+    await close_redis()
+
+
+async def _warm_up() -> None:
+    """Pay one-time costs at startup instead of on the first user request."""
+    # Load the tokenizer (may download its BPE file on a fresh machine)
+    try:
+        await asyncio.to_thread(count_tokens, "warmup")
+    except Exception as e:
+        logfire.warn("Tokenizer warmup failed: {error}", error=str(e))
+    
+    # Build the JSON schemas Instructor sends with every post request
+    instructor.generate_openai_schema(POST_RESPONSE_MODEL)
+    LinkedInPostDraft.model_json_schema()
+    
+    # Open TLS connections to the search APIs in the shared pool
+    await warm_up_connections([TAVILY_SEARCH_URL, EXA_BASE_URL])
+
+
 # Initialize FastAPI
 app = FastAPI(
     title="LinkedIn Content Research Agent",
     description="AI agent with tools for web search and YouTube transcription",
-    version="4.0.0"
+    version="4.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # orjson serializes responses faster than stdlib json
 )
 
 # Instrument FastAPI with Logfire
-logfire.instrument_fastapi(app)
+logfire.instrument_fastapi(app, excluded_urls=LOGFIRE_EXCLUDED_URLS)
+
+# Compress JSON responses (posts, upload previews); SSE streams are left uncompressed
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+
+class UploadSizeLimitMiddleware:
+    """Reject oversized PDF uploads from Content-Length, before the body is read.
+    
+    FastAPI spools the whole multipart body before upload_document runs, so
+    its own size check comes after the transfer. Uploads without a
+    Content-Length (chunked) still get that check.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] == UPLOAD_PATH:
+            content_length = Headers(scope=scope).get("content-length")
+            if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_REQUEST_BYTES:
+                try:
+                    validate_file_size(int(content_length))
+                except ValueError as e:
+                    response = ORJSONResponse({"detail": str(e)}, status_code=413)
+                    await response(scope, receive, send)
+                    return
+        
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(UploadSizeLimitMiddleware)
 
 # Configure CORS - allow frontend domain
 allowed_origins = [
@@ -85,95 +293,63 @@ allowed_origins = [
     "http://localhost:3000",  # Alternative local port
 ]
 
-# Add production frontend URL if set
-if FRONTEND_URL:
-    allowed_origins.append(FRONTEND_URL)
+# Add production frontend URL and any extra comma-separated origins if set
+allowed_origins.append(FRONTEND_URL)
+allowed_origins.extend(os.getenv("CORS_ORIGINS", "").split(","))
+
+# Browsers send Origin without a trailing slash; drop blanks and duplicates
+allowed_origins = list(dict.fromkeys(
+    origin.strip().rstrip("/") for origin in allowed_origins if origin.strip()
+))
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
     allow_credentials=True,
-    allow_methods=["*"],
+    allow_methods=["GET", "POST", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    max_age=3600,  # Let browsers cache preflight responses
 )
 
-# Initialize OpenAI client for Instructor
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Shared async OpenAI client for Instructor (keeps the event loop free during LLM calls)
+# HTTP/2 multiplexes concurrent completions over one pooled TLS connection;
+# the research agent and Whisper transcription use the same pool
+openai_client = get_openai_client()
+set_default_openai_client(openai_client, use_for_tracing=False)
 instructor_client = instructor.from_openai(openai_client)
 
-# Initialize Research Agent with tools
-research_agent = Agent(
-    name="LinkedIn Research Agent",
-    instructions="""You are a research assistant for LinkedIn content creation.
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-DECISION ORDER (Follow this EXACT sequence)
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-STEP 1: CHECK IF THIS IS A REFINEMENT REQUEST (Check CURRENT user message ONLY)
-
-Is the CURRENT request asking to modify/refine a previous post?
-
-REFINEMENT INDICATORS (if ANY of these are present → NO TOOL NEEDED):
-✓ "add more..." / "add some..." / "include..."
-✓ "remove..." / "delete..." / "take out..."
-✓ "make it more..." / "make it less..."
-✓ "shorten" / "shorter" / "longer" / "expand"
-✓ "change the tone" / "more formal" / "more casual"
-✓ "more emojis" / "fewer hashtags" / "different hashtags"
-✓ "rewrite" / "rephrase" / "improve"
-
-→ If REFINEMENT detected: Use conversation context to refine. DO NOT CALL ANY TOOL.
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-STEP 2: IF NOT REFINEMENT, CHECK FOR NEW CONTENT REQUEST
-
-Look at CURRENT user message ONLY (ignore conversation history for this check):
-
-A) Does CURRENT message contain [file_id: ...]?
-   → YES: Extract file_id and topic → Call file_search(file_id, topic_query)
-   → Example: "[file_id: abc-123] climate change" → file_search("abc-123", "climate change")
-
-B) Does CURRENT message contain a YouTube URL (youtube.com or youtu.be)?
-   → YES: Call youtube_transcribe(video_url)
-
-C) None of the above?
-   → Call web_search(query) for general topics, trends, news
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# Instructor wraps a plain response model in a freshly built OpenAISchema
+# subclass on every call, so its tool-schema cache (keyed by class) never hits;
+# wrapping once keeps the class, validator and schema across requests
+POST_RESPONSE_MODEL = instructor.openai_schema(LinkedInPost)
 
-EXAMPLES:
 
-Example 1 - REFINEMENT (NO TOOL):
-Previous: "User: [file_id: abc-123] climate change"
-Current: "add more emojis"
-→ This is REFINEMENT → Use conversation context → NO TOOL
+async def _embed_query(text: str) -> List[float]:
+    """Embed a query for the semantic post cache."""
+    response = await openai_client.embeddings.create(model="text-embedding-3-small", input=text)
+    return response.data[0].embedding
 
-Example 2 - REFINEMENT (NO TOOL):
-Previous: "User: AI trends"
-Current: "make it more formal"
-→ This is REFINEMENT → Use conversation context → NO TOOL
 
-Example 3 - NEW CONTENT (USE TOOL):
-Current: "[file_id: abc-123] renewable energy"
-→ This is NEW CONTENT → Call file_search("abc-123", "renewable energy")
+# Semantic post cache for reworded queries (None unless SEMANTIC_CACHE_DISTANCE is set)
+semantic_cache = create_semantic_cache(_embed_query)
 
-Example 4 - NEW CONTENT (USE TOOL):
-Current: "cryptocurrency trends 2024"
-→ This is NEW CONTENT → Call web_search("cryptocurrency trends 2024")
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# Initialize Research Agent with tools
+research_agent = Agent(
+    name="LinkedIn Research Agent",
+    # Kept terse: sent on every agent turn. Rules mirror the Python fast paths
+    # (REFINEMENT_PATTERN, FILE_ID_QUERY_PATTERN, YOUTUBE_URL_PATTERN).
+    instructions="""You are a research assistant for LinkedIn content creation.
 
-CRITICAL RULES:
-1. ALWAYS check for refinement FIRST before checking for file_id/URL
-2. Only look at CURRENT user message, not conversation history, to detect file_id/URL
-3. If refinement detected, NEVER call any tool
-4. Each tool call is expensive - only use when absolutely necessary
-5. Return tool results as-is - content generation system will process them
+Decide from the CURRENT user message only (never from conversation history), in this order:
+1. Refinement of the previous post (add/remove/shorten/expand, rewrite/rephrase/improve, make it more/less..., tone, emojis, hashtags): call NO tool; refine using the previous conversation.
+2. Contains [file_id: X]: call file_search(X, rest of the message as topic_query).
+3. Contains a YouTube URL (youtube.com or youtu.be): call youtube_transcribe(url).
+4. Otherwise: call web_search(query).
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━""",
+Tool calls are expensive: call at most one. Return tool results as-is; a separate step writes the post.""",
     model="gpt-4o-mini",
+    # Route every run to servers that already cache the (static) instructions
+    model_settings=ModelSettings(extra_args={"prompt_cache_key": "research-agent"}),
     tools=[web_search, youtube_transcribe, file_search]
 )
 
@@ -189,21 +365,24 @@ async def root():
         "endpoints": {
             "upload_document": "/api/upload-document",
             "generate_post": "/api/generate-post",
+            "generate_posts_batch": "/api/generate-posts-batch",
+            "batch_status": "/api/batch/{batch_id}",
             "clear_conversation": "/api/conversation/{conversation_id}"
         }
     }
 
 
-@app.post("/api/upload-document", response_model=DocumentMetadata)
+@app.post(UPLOAD_PATH, response_model=DocumentMetadata)
 async def upload_document(file: UploadFile = File(...)):
     """Upload and process PDF document for LinkedIn post generation.
     
     Flow:
     1. Validate file size (≤3MB)
-    2. Extract text from PDF
-    3. Count tokens
-    4. Determine tier (direct ≤80k or RAG >80k)
-    5. Store in memory (full text or vector store)
+    2. Hash the content; re-uploads of a stored direct-tier PDF reuse it
+    3. Extract text from PDF
+    4. Count tokens
+    5. Determine tier (direct ≤80k or RAG >80k)
+    6. Store in memory (full text or vector store)
     
     Returns:
         DocumentMetadata with file_id, token count, tier, and next steps message
@@ -216,94 +395,111 @@ async def upload_document(file: UploadFile = File(...)):
         )
     
     try:
-        # Read file content
-        content = await file.read()
-        file_size = len(content)
+        # Starlette spools the upload while parsing the form and records its size,
+        # so the PDF is parsed straight from the spooled file without copying it
+        file_size = file.size if file.size is not None else file.file.seek(0, io.SEEK_END)
         
         # Validate file size (3MB limit)
         validate_file_size(file_size)
         
-        # Save temporarily for extraction
-        temp_path = f"/tmp/{uuid.uuid4()}.pdf"
-        with open(temp_path, "wb") as f:
-            f.write(content)
-        
-        # Extract text from PDF
-        text = extract_text_from_pdf(temp_path)
-        
-        # Clean up temp file
-        os.remove(temp_path)
-        
-        if not text.strip():
-            raise HTTPException(
-                status_code=400,
-                detail="Unable to extract text from PDF. The file may be empty or image-based."
-            )
-        
-        # Count tokens
-        token_count = count_tokens(text)
-        
-        # Validate token count (120k limit)
-        validate_token_count(token_count)
-        
-        # Determine processing tier
-        tier = determine_tier(token_count)
+        # The content hash is the file_id, so re-uploading a direct-tier PDF
+        # that is still stored skips parsing and token counting entirely
+        file_id = await asyncio.to_thread(_hash_upload, file.file)
+        doc = await document_store.get(file_id)
         
-        # Generate unique file ID
-        file_id = str(uuid.uuid4())
+        # RAG metadata can outlive the in-process Chroma collection (Redis store,
+        # restarts, other workers), so RAG re-uploads are re-indexed;
+        # create_vector_store skips embedding when the collection is intact
+        if doc is None or doc.tier == "rag":
+            # PDF parsing, token counting and embedding are blocking; run them off the event loop
+            file.file.seek(0)
+            doc = await asyncio.to_thread(_process_document, file.file, file.filename, file_id)
         
-        # Process based on tier
-        if tier == "direct":
-            # Store full text in memory
-            doc = DocumentContent(
-                file_id=file_id,
-                filename=file.filename,
-                token_count=token_count,
-                tier=tier,
-                full_text=text,
-                vector_store_id=None
-            )
-            message = "Document uploaded! What specific topic or angle would you like to create a LinkedIn post about?"
-        
-        else:  # RAG tier
-            # Create vector store with embeddings
-            vector_store_id = create_vector_store(file_id, text)
-            
-            doc = DocumentContent(
-                file_id=file_id,
-                filename=file.filename,
-                token_count=token_count,
-                tier=tier,
-                full_text=None,
-                vector_store_id=vector_store_id
-            )
-            message = "Large document uploaded and indexed! What specific topic or angle would you like to create a LinkedIn post about?"
-        
-        # Store document
-        document_store[file_id] = doc
+        # Store document (for a re-upload this also restarts its TTL)
+        await document_store.set(doc)
         
         # Return metadata
         return DocumentMetadata(
-            file_id=file_id,
+            file_id=doc.file_id,
             filename=file.filename,
             size_bytes=file_size,
-            token_count=token_count,
-            tier=tier,
-            message=message
+            token_count=doc.token_count,
+            tier=doc.tier,
+            message=UPLOAD_MESSAGES[doc.tier]
         )
     
     except ValueError as e:
-        # Handle validation errors (file size, token count)
+        # Handle validation errors (file size, token count, no text)
         raise HTTPException(status_code=400, detail=str(e)) from e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}") from e
 
 
+def _hash_upload(pdf: BinaryIO) -> str:
+    """SHA-256 hex digest of an uploaded file, read in chunks from the start."""
+    pdf.seek(0)
+    digest = hashlib.sha256()
+    for block in iter(lambda: pdf.read(1024 * 1024), b""):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def _process_document(pdf: BinaryIO, filename: str, file_id: str) -> DocumentContent:
+    """Extract, measure and index an uploaded PDF (blocking; run in a thread).
+    
+    Args:
+        pdf: Uploaded PDF as a binary file object
+        filename: Original filename
+        file_id: Content hash of the PDF, used as its document ID
+        
+    Returns:
+        Document to store
+        
+    Raises:
+        ValueError: If no text can be extracted or the document is too long
+    """
+    # Extract text page by page from the spooled upload, counting tokens as it
+    # goes; documents over the 120k limit are rejected before the remaining pages
+    text, token_count = extract_text_with_token_count(pdf)
+    
+    if not text.strip():
+        raise ValueError("Unable to extract text from PDF. The file may be empty or image-based.")
+    
+    # Determine processing tier
+    tier = determine_tier(token_count)
+    
+    # Process based on tier
+    if tier == "direct":
+        # Store full text in memory
+        doc = DocumentContent(
+            file_id=file_id,
+            filename=filename,
+            token_count=token_count,
+            tier=tier,
+            full_text=text,
+            vector_store_id=None
+        )
+    
+    else:  # RAG tier
+        # Create vector store with embeddings
+        vector_store_id = create_vector_store(file_id, text)
+        
+        doc = DocumentContent(
+            file_id=file_id,
+            filename=filename,
+            token_count=token_count,
+            tier=tier,
+            full_text=None,
+            vector_store_id=vector_store_id
+        )
+    
+    return doc
+
+
 @app.delete("/api/conversation/{conversation_id}")
 async def clear_conversation(conversation_id: str):
     """Clear conversation history for a given conversation ID."""
-    if conversation_id in conversation_store:
-        del conversation_store[conversation_id]
+    if await conversation_store.clear(conversation_id):
         return {"message": f"Conversation {conversation_id} cleared successfully"}
     return {"message": "Conversation not found (already cleared)"}
 
@@ -326,150 +522,611 @@ async def generate_post(request: LinkedInPostRequest):
     """
     try:
         # Generate or retrieve conversation ID
-        conversation_id = request.conversation_id or str(uuid.uuid4())
+        conversation_id = request.conversation_id or uuid7().hex
         
-        # Build context-aware input by prepending recent history to current query
-        context_input = request.query
-        if conversation_id in conversation_store:
-            stored_history = conversation_store[conversation_id]
-            
-            if stored_history:
-                # Keep only last 1 exchange (2 messages) to prevent context overflow
-                # This is enough for refinements while staying within token limits
-                recent_messages = stored_history[-2:] if len(stored_history) > 2 else stored_history
-                
-                context_parts = []
-                
-                # Add recent exchanges with smart truncation
-                for msg in recent_messages:
-                    role = "User" if msg["role"] == "user" else "Assistant"
-                    # Truncate both user and assistant messages to key content
-                    if msg["role"] == "assistant":
-                        # Keep first 1000 chars of post (still has key content)
-                        content = msg["content"][:1000] if len(msg["content"]) > 1000 else msg["content"]
-                    else:
-                        content = msg["content"][:200] if len(msg["content"]) > 200 else msg["content"]
-                    context_parts.append(f"{role}: {content}")
-                
-                context_str = "\n\n".join(context_parts)
-                context_input = f"Previous conversation:\n{context_str}\n\nCurrent request: {request.query}"
-        
-        # Step 1: Run agent with context-aware input
-        agent_result = await Runner.run(
-            research_agent,
-            context_input
-        )
+        # Step 1: Run agent and collect research data
+        research = await _run_research(request.query, conversation_id)
         
-        # Check for tool errors in the result
-        for item in agent_result.new_items:
-            # Check tool output for errors
-            if hasattr(item, 'output'):
-                output_str = str(item.output)
-                if ("too long" in output_str.lower() or 
-                    "maximum allowed" in output_str.lower() or 
-                    "exceeds limit" in output_str.lower()):
-                    # Extract the actual error message (strip agent's wrapper text)
-                    if "Error:" in output_str:
-                        error_msg = output_str.split("Error:", 1)[1].strip()
-                    else:
-                        error_msg = output_str.strip()
-                    raise HTTPException(status_code=400, detail=error_msg)
-            
-            # Check message content for errors
-            if hasattr(item, 'content') and isinstance(item.content, str):
-                if ("too long" in item.content.lower() or 
-                    "maximum allowed" in item.content.lower() or 
-                    "exceeds limit" in item.content.lower()):
-                    raise HTTPException(status_code=400, detail=item.content.strip())
-            
-            # Check error attribute
-            if hasattr(item, 'error') and item.error:
-                error_msg = str(item.error)
-                if ("too long" in error_msg.lower() or 
-                    "maximum allowed" in error_msg.lower() or 
-                    "exceeds limit" in error_msg.lower()):
-                    raise HTTPException(status_code=400, detail=error_msg.strip())
-        
-        # Extract research data from agent result
-        research_data = str(agent_result.final_output or "")
-        
-        if not research_data:
-            raise HTTPException(
-                status_code=400,
-                detail="No research data returned from tools"
+        # Step 2: Generate LinkedIn post with Instructor (identical inputs reuse the cached post)
+        cache_key = post_cache_key(request.query, research.data)
+        linkedin_post = await post_cache.get(cache_key)
+        if linkedin_post is None and semantic_cache is not None:
+            linkedin_post = await semantic_cache.get(request.query, research.data)
+        if linkedin_post is None:
+            linkedin_post = await post_generations.run(
+                cache_key,
+                lambda: _generate_and_cache_post(request.query, research, cache_key)
             )
         
-        # Truncate research_data to fit within GPT-4o-mini context (128k)
-        # Reserve space for prompts (~2k), conversation history (~5k), and safety buffer (~10k)
-        # Max research data: ~15k tokens to be safe
-        research_data = truncate_text(research_data, max_tokens=15_000)
-        
-        # Determine which tool was used
-        tool_used = None
-        for item in agent_result.new_items:
-            if hasattr(item, 'tool_name'):
-                tool_used = item.tool_name
-                break
-        
-        # Step 2: Generate LinkedIn post with Instructor
-        linkedin_post = _generate_linkedin_post(
-            query=request.query,
-            research_data=research_data
-        )
-        
         # Step 3: Store conversation history
-        assistant_message = f"{linkedin_post.content}\n\n{' '.join(linkedin_post.hashtags)}"
-        
-        # Initialize conversation if new
-        if conversation_id not in conversation_store:
-            conversation_store[conversation_id] = []
-        
-        # Append to conversation history
-        conversation_store[conversation_id].append({"role": "user", "content": request.query})
-        conversation_store[conversation_id].append({"role": "assistant", "content": assistant_message})
+        await _store_exchange(conversation_id, request.query, linkedin_post)
         
         # Step 4: Return response with conversation ID
-        return LinkedInPostResponse(
+        # Every field is already trusted: the post was validated against
+        # LinkedInPost (by Instructor or the cache) and the rest are our own
+        # values, so skip re-validating the envelope
+        response = LinkedInPostResponse.model_construct(
             post=linkedin_post,
-            tool_used=tool_used,
+            tool_used=research.tool_used,
             conversation_id=conversation_id
         )
+        
+        # Serialize once in pydantic-core; returning a Response skips FastAPI's
+        # response_model validation and encoding (the schema still documents it)
+        return Response(content=response.model_dump_json(), media_type="application/json")
+    
+    except HTTPException:
+        raise
+    except ValueError as e:
+        # Handle tool validation errors (e.g., video too long, topic not in document)
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+@app.post("/api/generate-post/stream")
+async def generate_post_stream(request: LinkedInPostRequest):
+    """Generate a LinkedIn post and stream it back as Server-Sent Events.
+    
+    Research runs exactly as in /api/generate-post; errors up to that point
+    are returned as normal HTTP errors. The post is then streamed as it is
+    generated so the client can render text before the full post is ready.
     
+    Events:
+        - (default): partial LinkedInPost JSON, fields fill in over time
+        - done: final LinkedInPostResponse JSON
+        - error: {"detail": "..."} if generation fails mid-stream
+    
+    Returns:
+        StreamingResponse with media type text/event-stream
+    """
+    try:
+        conversation_id = request.conversation_id or uuid7().hex
+        research = await _run_research(request.query, conversation_id)
     except HTTPException:
         raise
     except ValueError as e:
-        # Handle tool validation errors (e.g., video too long)
-        error_msg = str(e)
-        if "too long" in error_msg.lower() or "exceeds limit" in error_msg.lower():
-            raise HTTPException(status_code=400, detail=error_msg) from e
-        raise HTTPException(status_code=400, detail=error_msg) from e
+        raise HTTPException(status_code=400, detail=str(e)) from e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
+    
+    return StreamingResponse(
+        _stream_post_events(request.query, research, conversation_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/api/generate-posts-batch", response_model=BatchJobResponse)
+async def generate_posts_batch(request: BatchPostRequest):
+    """Queue post generation for many topics on the OpenAI Batch API.
+    
+    Research runs now (BATCH_RESEARCH_CONCURRENCY agents at a time); the
+    post-writing calls go to the Batch API, which costs half as much and
+    completes within 24 hours. Poll /api/batch/{batch_id} for the posts.
+    
+    Batch posts are not added to any conversation history.
+    
+    Returns:
+        BatchJobResponse with the batch ID and its initial status
+    """
+    slots = asyncio.Semaphore(BATCH_RESEARCH_CONCURRENCY)
+    
+    async def research_query(index: int, query: str) -> Research:
+        async with slots:
+            try:
+                return await _run_research(query, uuid7().hex)
+            except HTTPException as e:
+                raise HTTPException(status_code=e.status_code, detail=f"Query {index + 1}: {e.detail}") from e
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Query {index + 1}: {e}") from e
+    
+    try:
+        researches = await _gather_or_cancel(
+            research_query(index, query) for index, query in enumerate(request.queries)
+        )
+        
+        request_lines = "\n".join(
+            _batch_request_line(index, query, research)
+            for index, (query, research) in enumerate(zip(request.queries, researches))
+        )
+        batch_file = await openai_client.files.create(
+            file=("linkedin-posts.jsonl", request_lines.encode()),
+            purpose="batch"
+        )
+        batch = await openai_client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        
+        return BatchJobResponse(batch_id=batch.id, status=batch.status)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+async def _gather_or_cancel(coros: Iterable[Awaitable[T]]) -> List[T]:
+    """Run awaitables concurrently like asyncio.gather, but fail fast.
+    
+    On the first exception the tasks still running are cancelled (so a
+    rejected batch stops making agent, search and Whisper calls) and every
+    task's outcome is retrieved before the error is raised.
+    
+    Args:
+        coros: Awaitables to run
+        
+    Returns:
+        Results in input order
+        
+    Raises:
+        The first exception, in input order, raised by any awaitable
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        # Also reached when the request itself is cancelled mid-wait
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    for task in tasks:
+        if not task.cancelled() and task.exception() is not None:
+            raise task.exception()
+    return [task.result() for task in tasks]
+
+
+@app.get("/api/batch/{batch_id}", response_model=BatchJobResponse)
+async def get_batch(batch_id: str):
+    """Return a batch job's status, plus its posts once it has completed.
+    
+    Returns:
+        BatchJobResponse; results are set when status is 'completed'
+    """
+    try:
+        batch = await openai_client.batches.retrieve(batch_id)
+    except openai.NotFoundError as e:
+        raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found") from e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+    
+    if batch.status != "completed":
+        return BatchJobResponse(batch_id=batch.id, status=batch.status)
+    
+    try:
+        # Successful requests land in the output file, failed ones in the error file
+        output_files = [file_id for file_id in (batch.output_file_id, batch.error_file_id) if file_id]
+        contents = await asyncio.gather(*(openai_client.files.content(file_id) for file_id in output_files))
+        
+        results = [
+            _parse_batch_result_line(line)
+            for content in contents
+            for line in content.text.splitlines()
+            if line.strip()
+        ]
+        results.sort(key=lambda result: result.index)
+        
+        return BatchJobResponse(batch_id=batch.id, status=batch.status, results=results)
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+@dataclass(slots=True)
+class Research:
+    """Input for post generation.
+    
+    For refinements, data is the previous post, history holds the
+    previous exchange and conversation_id is set; no tool runs.
+    """
+    data: str
+    tool_used: Optional[str] = None
+    history: Optional[List[Dict[str, str]]] = None
+    conversation_id: Optional[str] = None
+    
+    @property
+    def is_document(self) -> bool:
+        return self.tool_used == "file_search"
+
+
+async def _run_research(query: str, conversation_id: str) -> Research:
+    """Run the research agent with conversation context.
+    
+    Research for an input seen within RESEARCH_CACHE_TTL_SECONDS is reused
+    from research_cache without calling any tool.
+    
+    Args:
+        query: User query
+        conversation_id: Conversation used for refinement context
+        
+    Returns:
+        Research with data truncated for the LLM and the name of the tool used
+        
+    Raises:
+        HTTPException: 400 on tool limit errors or empty research,
+            504 if the agent exceeds AGENT_TIMEOUT_SECONDS
+    """
+    # Fast path: pure refinements rewrite the previous post without new research
+    history = await _get_refinement_history(query, conversation_id)
+    if history is not None:
+        return Research(
+            data=history[-1]["content"],
+            history=history,
+            conversation_id=conversation_id
+        )
+    
+    # Last exchange (2 messages, truncated) is pre-rendered when history is stored
+    # This is enough for refinements while staying within token limits
+    context_str = await conversation_store.get_context(conversation_id)
+    
+    research_input = query
+    direct_call = None
+    if context_str:
+        # Follow-ups go to the agent, which decides between refining the previous
+        # post and new research; build context-aware input by prepending history
+        research_input = f"Previous conversation:\n{context_str}\n\nCurrent request: {query}"
+    else:
+        # Fast paths for first turns: file_id and YouTube requests call their tool
+        # without the agent, and a topic with no URL or document can only need web search
+        direct_call = _match_direct_tool(query)
+        if direct_call is None and not URL_PATTERN.search(query) and not FILE_ID_PREFIX_PATTERN.match(query):
+            direct_call = ("web_search", partial(_research_web, query))
+    
+    # Repeated inputs reuse recent research instead of calling tools again
+    cache_key = research_cache_key(research_input)
+    cached = await research_cache.get(cache_key)
+    if cached is not None:
+        research_data, tool_used = cached
+        return Research(data=research_data, tool_used=tool_used)
+    
+    if direct_call is not None:
+        tool_used, research_call = direct_call
+        research_data = await _with_research_timeout(research_call())
+    else:
+        research_data, tool_used = await _run_research_agent(research_input)
+    
+    # Truncate research_data to fit within GPT-4o-mini context (128k)
+    # Reserve space for prompts (~2k), conversation history (~5k), and safety buffer (~10k)
+    # Max research data: ~15k tokens to be safe
+    research = Research(data=truncate_text(research_data, max_tokens=15_000), tool_used=tool_used)
+    await research_cache.set(cache_key, research.data, research.tool_used)
+    return research
+
+
+async def _run_research_agent(agent_input: str) -> Tuple[str, Optional[str]]:
+    """Run the research agent and check its items for tool errors.
+    
+    Args:
+        agent_input: Query, with conversation context prepended if any
+        
+    Returns:
+        Tuple of (research data, name of the tool used)
+        
+    Raises:
+        HTTPException: 400 on tool limit errors or empty research,
+            504 if the agent exceeds AGENT_TIMEOUT_SECONDS
+    """
+    agent_result = await _with_research_timeout(Runner.run(research_agent, agent_input))
+    
+    # Check for tool errors and find the tool used in one pass over the items
+    inspection = _inspect_agent_items(agent_result.new_items)
+    if inspection.error_detail:
+        raise HTTPException(status_code=400, detail=inspection.error_detail)
+    
+    # Extract research data from agent result
+    research_data = str(agent_result.final_output or "")
+    
+    if not research_data:
+        raise HTTPException(
+            status_code=400,
+            detail="No research data returned from tools"
+        )
+    
+    return research_data, inspection.tool_used
+
+
+async def _with_research_timeout(research_call: Awaitable[T]) -> T:
+    """Await research, raising 504 after AGENT_TIMEOUT_SECONDS."""
+    try:
+        return await asyncio.wait_for(research_call, timeout=AGENT_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError as e:
+        raise HTTPException(
+            status_code=504,
+            detail=f"Research took longer than {AGENT_TIMEOUT_SECONDS:g} seconds. Please try again."
+        ) from e
+
+
+def _match_direct_tool(query: str) -> Optional[Tuple[str, Callable[[], Awaitable[str]]]]:
+    """Route queries whose tool is unambiguous without an agent LLM call.
+    
+    Mirrors the agent's rule order: a [file_id: ...] prefix with a topic
+    goes to file_search, otherwise a YouTube video URL goes to
+    youtube_transcribe. Anything else is left to the agent. Only used for
+    the first message of a conversation; follow-ups may be refinements.
+    
+    Args:
+        query: User query
+        
+    Returns:
+        Tuple of (tool name, research call), or None to use the agent
+    """
+    file_match = FILE_ID_QUERY_PATTERN.match(query)
+    if file_match:
+        file_id, topic_query = file_match.groups()
+        return "file_search", partial(search_document, file_id, topic_query.strip())
+    
+    video_match = YOUTUBE_URL_PATTERN.search(query)
+    if video_match:
+        return "youtube_transcribe", partial(_research_video, video_match.group(0))
+    
+    return None
+
+
+async def _research_web(query: str) -> str:
+    """Search the web and format the results as research data."""
+    results = await search_web(query)
+    if not results:
+        raise HTTPException(
+            status_code=400,
+            detail="No research data returned from tools"
+        )
+    
+    return "\n\n".join(
+        f"""Source {number}: {result.title}
+URL: {result.url}
+{result.content}"""
+        for number, result in enumerate(results, start=1)
+    )
+
+
+async def _research_video(video_url: str) -> str:
+    """Transcribe a YouTube video and format it as research data."""
+    video = await transcribe_video(video_url)
+    return f"""Video: {video.title}
+Channel: {video.author or "Unknown"}
+Duration: {video.duration_seconds // 60} min {video.duration_seconds % 60} s
+URL: {video.video_url}
+
+Transcript:
+{video.transcript}"""
+
+
+async def _get_refinement_history(query: str, conversation_id: str) -> Optional[List[Dict[str, str]]]:
+    """Return the previous exchange if the query only asks to refine its post.
+    
+    A query counts as a refinement when it is short, starts with an
+    imperative refinement phrasing (REFINEMENT_PATTERN), contains no URL,
+    and the conversation already has a generated post. Everything else,
+    including ambiguous follow-ups, goes to the agent.
+    
+    Args:
+        query: User query (may carry a [file_id: ...] prefix)
+        conversation_id: Conversation to look up the previous post in
+        
+    Returns:
+        Recent messages ending with the previous post, or None if the agent should run
+    """
+    instruction = FILE_ID_PREFIX_PATTERN.sub("", query, count=1)
+    if (
+        len(instruction) > MAX_REFINEMENT_QUERY_CHARS
+        or URL_PATTERN.search(instruction)
+        or not REFINEMENT_PATTERN.match(instruction)
+    ):
+        return None
+    
+    history = await conversation_store.get_recent(conversation_id, CONTEXT_MESSAGES)
+    if not history or history[-1]["role"] != "assistant":
+        return None
+    
+    return history
+
+
+async def _store_exchange(conversation_id: str, query: str, linkedin_post: LinkedInPost) -> None:
+    """Append a user query and the generated post to conversation history."""
+    assistant_message = f"{linkedin_post.content}\n\n{linkedin_post.hashtags_str}"
+    
+    # Append to conversation history (creates the conversation if new)
+    await conversation_store.append(conversation_id, [
+        {"role": "user", "content": query},
+        {"role": "assistant", "content": assistant_message}
+    ])
+
+
+def _sse_event(data: str, event: Optional[str] = None) -> str:
+    """Format one Server-Sent Event."""
+    if event:
+        return f"event: {event}\ndata: {data}\n\n"
+    return f"data: {data}\n\n"
+
+
+async def _stream_post_events(
+    query: str,
+    research: Research,
+    conversation_id: str
+) -> AsyncIterator[str]:
+    """Yield SSE events for a post as Instructor streams partial results.
+    
+    History and the post cache are only updated once the complete post
+    has been validated.
+    """
+    try:
+        cache_key = post_cache_key(query, research.data)
+        linkedin_post = await post_cache.get(cache_key)
+        
+        if linkedin_post is None:
+            partial_post = None
+            async for partial_post in instructor_client.chat.completions.create_partial(
+                model=POST_MODEL,
+                response_model=LinkedInPostDraft,
+                messages=_build_post_messages(query, research),
+                **_completion_params(research)
+            ):
+                yield _sse_event(partial_post.model_dump_json())
+            
+            if partial_post is None:
+                raise ValueError("No post was generated")
+            
+            # Drafts carry no length constraints; validate the final state
+            linkedin_post = LinkedInPost.model_validate(partial_post.model_dump())
+            _check_not_in_document(linkedin_post, research.is_document)
+            
+            # Cache writes and the history append are independent; overlap them
+            await asyncio.gather(
+                _cache_post(query, research, cache_key, linkedin_post),
+                _store_exchange(conversation_id, query, linkedin_post)
+            )
+        else:
+            await _store_exchange(conversation_id, query, linkedin_post)
+        
+        # Trusted fields (validated post, our own metadata); see generate_post
+        response = LinkedInPostResponse.model_construct(
+            post=linkedin_post,
+            tool_used=research.tool_used,
+            conversation_id=conversation_id
+        )
+        yield _sse_event(response.model_dump_json(), event="done")
+    
+    except Exception as e:
+        yield _sse_event(json.dumps({"detail": str(e)}), event="error")
+
+
+@dataclass(slots=True)
+class AgentInspection:
+    """What generate_post needs to know about an agent run."""
+    tool_used: Optional[str] = None
+    error_detail: Optional[str] = None
+
+
+def _inspect_agent_items(items) -> AgentInspection:
+    """Scan agent run items once for the tool used and any tool limit error.
+    
+    Args:
+        items: agent_result.new_items
+        
+    Returns:
+        AgentInspection with the first tool name and the first error found
+    """
+    inspection = AgentInspection()
+    
+    for item in items:
+        if inspection.tool_used is None and getattr(item, "type", None) == "tool_call_item":
+            inspection.tool_used = getattr(item.raw_item, "name", None)
+        
+        # Tool outputs, message content and error attributes are checked
+        # together; an item carries at most one of them
+        text = getattr(item, "output", None) or getattr(item, "content", None) or getattr(item, "error", None)
+        if not text:
+            continue
+        
+        text = str(text)
+        if TOOL_ERROR_PATTERN.search(text):
+            # Extract the actual error message (strip agent's wrapper text)
+            inspection.error_detail = text.split("Error:", 1)[-1].strip()
+            break
+    
+    return inspection
+
+
+async def _generate_and_cache_post(query: str, research: Research, cache_key: str) -> LinkedInPost:
+    """Generate a post and store it in the post cache."""
+    linkedin_post = await _generate_linkedin_post(query=query, research=research)
+    await _cache_post(query, research, cache_key, linkedin_post)
+    return linkedin_post
+
+
+async def _cache_post(query: str, research: Research, cache_key: str, linkedin_post: LinkedInPost) -> None:
+    """Store a post in the exact and semantic caches concurrently.
+    
+    The semantic write may embed the query (a network call), so it should
+    not wait behind the post cache write.
+    """
+    writes = [post_cache.set(cache_key, linkedin_post)]
+    if semantic_cache is not None:
+        writes.append(semantic_cache.set(query, research.data, linkedin_post))
+    await asyncio.gather(*writes)
 
 
-def _generate_linkedin_post(query: str, research_data: str) -> LinkedInPost:
+async def _generate_linkedin_post(query: str, research: Research) -> LinkedInPost:
     """
     Generate LinkedIn post using Instructor for structured output.
     
     Args:
         query: Original user query
-        research_data: Formatted research from tool execution
+        research: Research from tool execution, or the previous exchange for refinements
         
     Returns:
         LinkedInPost with structured content
     """
-    # Check if this is from a document (file_search tool)
-    is_document = "Document:" in research_data and ("Full document content:" in research_data or "Relevant sections retrieved" in research_data)
+    is_document = research.is_document
+    attempt = research
     
-    # Build system prompt with document grounding if needed
-    system_prompt = LINKEDIN_SYSTEM_PROMPT
-    if is_document:
-        system_prompt = LINKEDIN_SYSTEM_PROMPT + "\n\n" + DOCUMENT_GROUNDING_PROMPT
+    # Each context-length error retries with the research truncated to the
+    # next budget; None marks the last attempt
+    for retry_tokens in (*CONTEXT_RETRY_TOKENS, None):
+        try:
+            linkedin_post, completion = await instructor_client.chat.completions.create_with_completion(
+                model=POST_MODEL,
+                response_model=POST_RESPONSE_MODEL,
+                messages=_build_post_messages(query, attempt),
+                **_completion_params(research)
+            )
+        except Exception as e:
+            if retry_tokens is not None and CONTEXT_LENGTH_ERROR_PATTERN.search(str(e)):
+                attempt = replace(research, data=truncate_text(research.data, max_tokens=retry_tokens))
+                continue
+            
+            # If generation fails or topic not in document, raise clear error
+            if NOT_IN_DOCUMENT_PATTERN.search(str(e)):
+                raise ValueError(str(e))
+            raise
+        
+        _log_prompt_cache_usage(completion)
+        _check_not_in_document(linkedin_post, is_document)
+        
+        return linkedin_post
+
+
+def _build_post_messages(query: str, research: Research) -> List[Dict[str, str]]:
+    """Build the chat messages for post generation.
+    
+    Refinements send the previous exchange as chat history followed by the
+    requested change, so one completion rewrites the post directly.
+    
+    Args:
+        query: Original user query
+        research: Research from tool execution, or the previous exchange for refinements
+        
+    Returns:
+        Messages starting with the (static) system prompt
+    """
+    if research.history is not None:
+        instruction = FILE_ID_PREFIX_PATTERN.sub("", query, count=1)
+        return [
+            {"role": "system", "content": LINKEDIN_SYSTEM_PROMPT},
+            *research.history,
+            {"role": "user", "content": f"""Refine your previous post: {instruction}
+
+Keep its facts and apply only the requested change.
+
+CRITICAL: Return TWO separate fields:
+1. "content" - Post text WITHOUT hashtags
+2. "hashtags" - Array of 3-5 hashtag strings
+
+Do NOT include hashtags in content."""}
+        ]
+    
+    is_document = research.is_document
+    
+    # Document posts use the system prompt with grounding rules appended
+    system_prompt = DOCUMENT_SYSTEM_PROMPT if is_document else LINKEDIN_SYSTEM_PROMPT
     
     user_prompt = f"""Topic: {query}
 
 Research Content:
-{research_data}
+{research.data}
 
 Create a compelling LinkedIn post that synthesizes this research following best practices.
 
@@ -482,60 +1139,90 @@ Do NOT include any hashtags in the content field."""
     if is_document:
         user_prompt += "\n\nREMINDER: Only use information explicitly stated in the document above. If the topic is not covered, you can still generate a response explaining this - use the content field to explain the topic is not in the document."
     
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def _batch_request_line(index: int, query: str, research: Research) -> str:
+    """Serialize one post-generation request as a Batch API JSONL line."""
+    return json.dumps({
+        "custom_id": f"post-{index}",
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {
+            "model": POST_MODEL,
+            "messages": _build_post_messages(query, research),
+            "response_format": POST_RESPONSE_FORMAT,
+            **_completion_params(research)
+        }
+    })
+
+
+def _parse_batch_result_line(line: str) -> BatchPostResult:
+    """Turn one Batch API output (or error) line into a BatchPostResult."""
+    data = json.loads(line)
+    index = int(data["custom_id"].removeprefix("post-"))
+    
+    response = data.get("response") or {}
+    body = response.get("body") or {}
+    if data.get("error") or response.get("status_code") != 200:
+        error = data.get("error") or body.get("error") or {}
+        return BatchPostResult(index=index, error=error.get("message", "Request failed"))
+    
     try:
-        linkedin_post = instructor_client.chat.completions.create(
-            model="gpt-4o-mini",
-            response_model=LinkedInPost,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7
-        )
-        
-        # Check if the post is actually a "not found" message
-        if is_document and ("cannot create" in linkedin_post.content.lower() or "not covered in" in linkedin_post.content.lower() or "not present in" in linkedin_post.content.lower()):
-            # This is an error message, raise it
-            raise ValueError(linkedin_post.content)
-        
-        return linkedin_post
-    except Exception as e:
-        # Handle context length errors
-        if "context_length_exceeded" in str(e) or "context window" in str(e).lower():
-            # Try again with more aggressive truncation
-            research_data_short = truncate_text(research_data, max_tokens=8_000)
-            user_prompt_short = f"""Topic: {query}
+        content = body["choices"][0]["message"]["content"]
+        return BatchPostResult(index=index, post=LinkedInPost.model_validate_json(content))
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        return BatchPostResult(index=index, error=f"Invalid post: {e}")
 
-Research Content (truncated):
-{research_data_short}
 
-Create a compelling LinkedIn post that synthesizes this research following best practices.
+def _completion_params(research: Research) -> Dict[str, object]:
+    """Sampling settings for post generation.
+    
+    New topics keep temperature 0.7 for varied writing and share a
+    prompt_cache_key per system prompt, so OpenAI routes them to servers
+    that already cache that prefix. Refinements are deterministic, so the
+    same change to the same post gives the same rewrite, and are keyed by
+    conversation, whose history is the longer shared prefix.
+    """
+    if research.history is None:
+        return {
+            "temperature": POST_TEMPERATURE,
+            "prompt_cache_key": "linkedin-post-document" if research.is_document else "linkedin-post"
+        }
+    
+    return {
+        "temperature": 0,
+        "seed": REFINEMENT_SEED,
+        "prompt_cache_key": research.conversation_id
+    }
 
-CRITICAL: Return TWO separate fields:
-1. "content" - Post text WITHOUT hashtags
-2. "hashtags" - Array of 3-5 hashtag strings
 
-Do NOT include hashtags in content."""
-            
-            if is_document:
-                user_prompt_short += "\n\nREMINDER: Only use information explicitly stated in the document above."
-            
-            # Retry with shorter content
-            linkedin_post = instructor_client.chat.completions.create(
-                model="gpt-4o-mini",
-                response_model=LinkedInPost,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt_short}
-                ],
-                temperature=0.7
-            )
-            return linkedin_post
-        
-        # If generation fails or topic not in document, raise clear error
-        if "cannot create" in str(e).lower() or "not covered" in str(e).lower() or "not present" in str(e).lower():
-            raise ValueError(str(e))
-        raise
+def _check_not_in_document(linkedin_post: LinkedInPost, is_document: bool) -> None:
+    """Raise ValueError if a document post is actually a "not found" message."""
+    if is_document and NOT_IN_DOCUMENT_CONTENT_PATTERN.search(linkedin_post.content):
+        # This is an error message, raise it
+        raise ValueError(linkedin_post.content)
+
+
+def _log_prompt_cache_usage(completion) -> None:
+    """Record how much of the prompt was served from OpenAI's prompt cache.
+    
+    The static system prompt is always the first message, so repeated calls
+    should report cached_tokens > 0 once the prefix is warm.
+    """
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        return
+    
+    details = getattr(usage, "prompt_tokens_details", None)
+    logfire.info(
+        "LinkedIn post prompt usage",
+        prompt_tokens=usage.prompt_tokens,
+        cached_tokens=getattr(details, "cached_tokens", None) or 0
+    )
 
 
 # ============================================================================
@@ -549,7 +1236,7 @@ async def linkedin_auth():
         raise HTTPException(status_code=500, detail="LinkedIn OAuth not configured")
     
     # Generate a session ID for this OAuth flow
-    session_id = str(uuid.uuid4())
+    session_id = uuid.uuid4().hex
     
     # LinkedIn authorization URL
     auth_url = (
@@ -571,57 +1258,78 @@ async def linkedin_callback(code: str, state: str):
         raise HTTPException(status_code=500, detail="LinkedIn OAuth not configured")
     
     # Exchange authorization code for access token
-    async with httpx.AsyncClient() as client:
-        token_response = await client.post(
-            "https://www.linkedin.com/oauth/v2/accessToken",
-            data={
-                "grant_type": "authorization_code",
-                "code": code,
-                "redirect_uri": LINKEDIN_REDIRECT_URI,
-                "client_id": LINKEDIN_CLIENT_ID,
-                "client_secret": LINKEDIN_CLIENT_SECRET,
-            },
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
+    client = get_http_client()
+    token_response = await client.post(
+        "https://www.linkedin.com/oauth/v2/accessToken",
+        data={
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": LINKEDIN_REDIRECT_URI,
+            "client_id": LINKEDIN_CLIENT_ID,
+            "client_secret": LINKEDIN_CLIENT_SECRET,
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    
+    if token_response.status_code != 200:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Failed to exchange code for token: {token_response.text}"
         )
-        
-        if token_response.status_code != 200:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Failed to exchange code for token: {token_response.text}"
-            )
-        
-        token_data = token_response.json()
-        access_token = token_data.get("access_token")
-        
-        # Store the access token with session ID
-        linkedin_tokens[state] = access_token
-        
-        # Redirect back to frontend with session ID
-        return RedirectResponse(url=f"{FRONTEND_URL}?linkedin_session={state}")
+    
+    token_data = token_response.json()
+    access_token = token_data.get("access_token")
+    
+    # Look up the Person URN once here so posting doesn't need a profile call
+    profile_response = await client.get(
+        "https://api.linkedin.com/v2/userinfo",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    
+    if profile_response.status_code != 200:
+        raise HTTPException(
+            status_code=400,
+            detail="Failed to fetch LinkedIn profile"
+        )
+    
+    # Store the access token and Person URN with session ID until the token expires
+    await linkedin_sessions.set(
+        state,
+        {
+            "access_token": access_token,
+            "person_urn": profile_response.json().get("sub"),  # OpenID Connect 'sub' claim is the Person URN
+        },
+        int(token_data.get("expires_in", LINKEDIN_SESSION_TTL_SECONDS))
+    )
+    
+    # Redirect back to frontend with session ID
+    return RedirectResponse(url=f"{FRONTEND_URL}?linkedin_session={state}")
 
 
 @app.get("/api/linkedin/profile")
 async def get_linkedin_profile(session_id: str):
     """Get LinkedIn profile for authenticated user"""
-    if session_id not in linkedin_tokens:
+    session = await linkedin_sessions.get(session_id)
+    if session is None:
         raise HTTPException(status_code=401, detail="Not authenticated with LinkedIn")
     
-    access_token = linkedin_tokens[session_id]
+    access_token = session["access_token"]
+    
+    client = get_http_client()
+    # Get user info
+    profile_response = await client.get(
+        "https://api.linkedin.com/v2/userinfo",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
     
-    async with httpx.AsyncClient() as client:
-        # Get user info
-        profile_response = await client.get(
-            "https://api.linkedin.com/v2/userinfo",
-            headers={"Authorization": f"Bearer {access_token}"},
+    if profile_response.status_code != 200:
+        raise HTTPException(
+            status_code=profile_response.status_code,
+            detail="Failed to fetch LinkedIn profile"
         )
-        
-        if profile_response.status_code != 200:
-            raise HTTPException(
-                status_code=profile_response.status_code,
-                detail="Failed to fetch LinkedIn profile"
-            )
-        
-        return profile_response.json()
+    
+    # Forward LinkedIn's JSON bytes as-is instead of parsing and re-encoding them
+    return Response(content=profile_response.content, media_type="application/json")
 
 
 @app.post("/api/linkedin/post")
@@ -631,10 +1339,11 @@ async def post_to_linkedin(
     hashtags: Optional[List[str]] = None
 ):
     """Post content to LinkedIn on behalf of user"""
-    if session_id not in linkedin_tokens:
+    session = await linkedin_sessions.get(session_id)
+    if session is None:
         raise HTTPException(status_code=401, detail="Not authenticated with LinkedIn")
     
-    access_token = linkedin_tokens[session_id]
+    access_token = session["access_token"]
     
     # Combine content and hashtags
     full_content = content
@@ -644,63 +1353,58 @@ async def post_to_linkedin(
         )
         full_content = f"{content}\n\n{formatted_hashtags}"
     
-    async with httpx.AsyncClient() as client:
-        # Get user's Person URN
-        profile_response = await client.get(
-            "https://api.linkedin.com/v2/userinfo",
-            headers={"Authorization": f"Bearer {access_token}"},
-        )
-        
-        if profile_response.status_code != 200:
-            raise HTTPException(
-                status_code=profile_response.status_code,
-                detail="Failed to fetch user profile"
-            )
-        
-        profile_data = profile_response.json()
-        person_urn = profile_data.get("sub")  # OpenID Connect 'sub' claim is the Person URN
-        
-        # Create the post using UGC Posts API
-        post_data = {
-            "author": f"urn:li:person:{person_urn}",
-            "lifecycleState": "PUBLISHED",
-            "specificContent": {
-                "com.linkedin.ugc.ShareContent": {
-                    "shareCommentary": {"text": full_content},
-                    "shareMediaCategory": "NONE",
-                }
-            },
-            "visibility": {"com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"},
-        }
-        
-        post_response = await client.post(
-            "https://api.linkedin.com/v2/ugcPosts",
-            json=post_data,
-            headers={
-                "Authorization": f"Bearer {access_token}",
-                "Content-Type": "application/json",
-                "X-Restli-Protocol-Version": "2.0.0",
-            },
+    # Person URN was looked up at login (linkedin_callback)
+    person_urn = session["person_urn"]
+    
+    # Create the post using UGC Posts API
+    post_data = {
+        "author": f"urn:li:person:{person_urn}",
+        "lifecycleState": "PUBLISHED",
+        "specificContent": {
+            "com.linkedin.ugc.ShareContent": {
+                "shareCommentary": {"text": full_content},
+                "shareMediaCategory": "NONE",
+            }
+        },
+        "visibility": {"com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"},
+    }
+    
+    post_response = await get_http_client().post(
+        "https://api.linkedin.com/v2/ugcPosts",
+        json=post_data,
+        headers={
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json",
+            "X-Restli-Protocol-Version": "2.0.0",
+        },
+    )
+    
+    if post_response.status_code not in [200, 201]:
+        raise HTTPException(
+            status_code=post_response.status_code,
+            detail=f"Failed to post to LinkedIn: {post_response.text}"
         )
-        
-        if post_response.status_code not in [200, 201]:
-            raise HTTPException(
-                status_code=post_response.status_code,
-                detail=f"Failed to post to LinkedIn: {post_response.text}"
-            )
-        
-        return {"success": True, "message": "Posted to LinkedIn successfully"}
+    
+    return {"success": True, "message": "Posted to LinkedIn successfully"}
 
 
 @app.delete("/api/linkedin/logout")
 async def linkedin_logout(session_id: str):
     """Logout from LinkedIn"""
-    if session_id in linkedin_tokens:
-        del linkedin_tokens[session_id]
+    await linkedin_sessions.delete(session_id)
     
     return {"success": True, "message": "Logged out from LinkedIn"}
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    
+    # uvicorn[standard] picks uvloop + httptools automatically where available.
+    # Multiple workers need REDIS_URL so they share conversation history.
+    uvicorn.run(
+        "backend.main:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", "8000")),
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        timeout_keep_alive=30
+    )
@@ -11,8 +11,8 @@ Schema Categories:
 - YouTube: Video transcription models
 """
 
+from functools import cached_property
 from typing import List, Optional
-from urllib.parse import urlparse
 
 from pydantic import BaseModel, Field, HttpUrl, field_validator
 
@@ -60,6 +60,30 @@ class LinkedInPost(BaseModel):
         min_length=3,
         max_length=5
     )
+    
+    @cached_property
+    def hashtags_str(self) -> str:
+        """Hashtags joined with spaces (computed once per post, not serialized)."""
+        return " ".join(self.hashtags)
+
+
+class LinkedInPostDraft(BaseModel):
+    """LinkedInPost without constraints, used for streaming.
+    
+    Instructor validates every partial state of a streamed response, so
+    required fields and constraints like min_length would reject the first
+    few chunks. The final draft is validated against LinkedInPost once
+    streaming ends.
+    """
+    
+    content: str = Field(
+        "",
+        description=LinkedInPost.model_fields["content"].description
+    )
+    hashtags: List[str] = Field(
+        default_factory=list,
+        description=LinkedInPost.model_fields["hashtags"].description
+    )
 
 
 class LinkedInPostResponse(BaseModel):
@@ -80,6 +104,40 @@ class LinkedInPostResponse(BaseModel):
     )
 
 
+class BatchPostRequest(BaseModel):
+    """API request for bulk post generation via the OpenAI Batch API."""
+    
+    queries: List[str] = Field(
+        ...,
+        description="Topics or YouTube URLs, one post each",
+        min_length=1,
+        max_length=50,
+        examples=[["AI trends in healthcare", "Remote work in 2025"]]
+    )
+
+
+class BatchPostResult(BaseModel):
+    """Outcome of one query in a completed batch."""
+    
+    index: int = Field(..., description="Position of the query in the batch request")
+    post: Optional[LinkedInPost] = Field(None, description="Generated post, if successful")
+    error: Optional[str] = Field(None, description="Why no post was generated")
+
+
+class BatchJobResponse(BaseModel):
+    """Status of a batch job, with results once it has completed."""
+    
+    batch_id: str = Field(..., description="OpenAI batch ID to poll")
+    status: str = Field(
+        ...,
+        description="OpenAI batch status: 'validating', 'in_progress', 'finalizing', 'completed', 'failed', 'expired', ..."
+    )
+    results: Optional[List[BatchPostResult]] = Field(
+        None,
+        description="Per-query results, ordered by index (only when completed)"
+    )
+
+
 # ============================================================================
 # WEB SEARCH SCHEMAS
 # ============================================================================
@@ -97,6 +155,9 @@ class SearchResult(BaseModel):
 # YOUTUBE SCHEMAS
 # ============================================================================
 
+YOUTUBE_HOSTS = ("youtube.com", "youtu.be")
+
+
 class YouTubeContent(BaseModel):
     """Transcribed YouTube video content."""
     
@@ -109,8 +170,9 @@ class YouTubeContent(BaseModel):
     @field_validator("video_url")
     @classmethod
     def validate_youtube_url(cls, url: HttpUrl) -> HttpUrl:
-        host = urlparse(str(url)).netloc.lower().split(":", 1)[0]
-        if not (host.endswith("youtube.com") or host.endswith("youtu.be")):
+        # HttpUrl has already parsed the URL; its host is lowercased and port-free
+        host = url.host or ""
+        if not any(host == domain or host.endswith("." + domain) for domain in YOUTUBE_HOSTS):
             raise ValueError("video_url must be a valid YouTube URL")
         return url
 
@@ -4,9 +4,15 @@ LinkedIn System Prompts
 Contains the system prompt that defines LinkedIn best practices for post generation.
 This prompt is used by GPT-4o-mini to ensure all generated posts follow
 professional LinkedIn content standards and maximize engagement.
+
+Prompts are static and always sent as the first message, so every request
+shares a byte-identical prefix that OpenAI's prompt caching can reuse.
+Keep per-request content (topic, research) out of these strings.
 """
 
-LINKEDIN_SYSTEM_PROMPT = """You are an expert LinkedIn content strategist with proven expertise in creating viral, high-engagement posts.
+from typing import Final
+
+LINKEDIN_SYSTEM_PROMPT: Final[str] = """You are an expert LinkedIn content strategist with proven expertise in creating viral, high-engagement posts.
 
 Your mission: Transform research into compelling LinkedIn content that stops the scroll and drives meaningful engagement.
 
@@ -106,7 +112,7 @@ CRITICAL: Do NOT include hashtags anywhere in the content field. They must be se
 OUTPUT: A ready-to-post LinkedIn masterpiece that provides real value and drives engagement."""
 
 
-DOCUMENT_GROUNDING_PROMPT = """
+DOCUMENT_GROUNDING_PROMPT: Final[str] = """
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 CRITICAL: DOCUMENT GROUNDING RULES
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -136,3 +142,6 @@ You are creating a LinkedIn post from an UPLOADED DOCUMENT. Follow these rules S
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 """
+
+# System prompt for document posts, built once at import
+DOCUMENT_SYSTEM_PROMPT: Final[str] = LINKEDIN_SYSTEM_PROMPT + "\n\n" + DOCUMENT_GROUNDING_PROMPT
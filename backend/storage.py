@@ -0,0 +1,407 @@
+"""
+Conversation Storage - Redis-backed history with in-memory fallback
+
+Stores per-conversation message history used for refinements, plus a
+pre-rendered context block (the last exchange, truncated) that is built
+once on append instead of on every request.
+
+- REDIS_URL set: each conversation is a Redis list (conv:{id}) shared by
+  all workers, trimmed to MAX_HISTORY_MESSAGES and expired after
+  CONVERSATION_TTL_SECONDS of inactivity. The context block lives in
+  conv:ctx:{id} with the same TTL.
+- REDIS_URL unset: history is kept in process memory (local development),
+  with the same inactivity TTL so abandoned conversations are dropped.
+
+Concurrency invariant: a conversation's list is only changed by append(),
+whose RPUSH + LTRIM + EXPIRE (and context refresh) run as one MULTI/EXEC
+transaction. Workers appending to the same conversation therefore never
+interleave, and the list never exceeds MAX_HISTORY_MESSAGES. Documents need
+no coordination: the file_id is a hash of the PDF, so concurrent uploads of
+the same file write identical values.
+
+Uploaded documents follow the same split: with Redis, metadata is JSON in
+doc:meta:{id} and full text is zlib-compressed in doc:text:{id}, both
+expiring after DOCUMENT_TTL_SECONDS.
+
+LinkedIn login sessions (access token + Person URN) are JSON in
+linkedin:session:{id}, expiring with the access token.
+"""
+
+import os
+import time
+import zlib
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Deque, Dict, List, Optional, Tuple
+
+import orjson
+import redis.asyncio as redis
+from dotenv import load_dotenv
+
+from backend.models.schema import DocumentContent
+
+# Load environment variables
+load_dotenv()
+
+# Conversation settings
+CONVERSATION_TTL_SECONDS = int(os.getenv("CONVERSATION_TTL_SECONDS", "3600"))
+MAX_HISTORY_MESSAGES = 20
+
+# Document settings
+DOCUMENT_TTL_SECONDS = int(os.getenv("DOCUMENT_TTL_SECONDS", "86400"))
+
+# LinkedIn session settings (used when the token response has no expires_in)
+LINKEDIN_SESSION_TTL_SECONDS = int(os.getenv("LINKEDIN_SESSION_TTL_SECONDS", "3600"))
+
+# Shared Redis clients (created lazily when REDIS_URL is set)
+_redis_client: Optional[redis.Redis] = None
+_redis_binary_client: Optional[redis.Redis] = None
+
+# Context settings: last exchange only, truncated to key content
+CONTEXT_MESSAGES = 2
+USER_CONTEXT_CHARS = 200
+ASSISTANT_CONTEXT_CHARS = 1000
+
+
+def get_redis(binary: bool = False) -> Optional[redis.Redis]:
+    """Return the shared Redis client, or None when REDIS_URL is not set.
+
+    Args:
+        binary: Return a client that yields raw bytes instead of decoded str
+    """
+    global _redis_client, _redis_binary_client
+
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url:
+        return None
+
+    if binary:
+        if _redis_binary_client is None:
+            _redis_binary_client = redis.Redis.from_url(redis_url)
+        return _redis_binary_client
+
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(redis_url, decode_responses=True)
+
+    return _redis_client
+
+
+async def close_redis() -> None:
+    """Close the shared Redis connection pools."""
+    global _redis_client, _redis_binary_client
+
+    if _redis_client is not None:
+        await _redis_client.aclose()
+        _redis_client = None
+
+    if _redis_binary_client is not None:
+        await _redis_binary_client.aclose()
+        _redis_binary_client = None
+
+
+def format_context(messages: List[Dict[str, str]]) -> str:
+    """Render messages as the conversation context passed to the agent.
+
+    Args:
+        messages: Recent messages (oldest first)
+
+    Returns:
+        "Role: content" blocks separated by blank lines
+    """
+    context_parts = []
+
+    for msg in messages:
+        if msg["role"] == "assistant":
+            # Keep first 1000 chars of post (still has key content)
+            context_parts.append(f"Assistant: {msg['content'][:ASSISTANT_CONTEXT_CHARS]}")
+        else:
+            context_parts.append(f"User: {msg['content'][:USER_CONTEXT_CHARS]}")
+
+    return "\n\n".join(context_parts)
+
+
+class InMemoryConversationStore:
+    """Process-local conversation history (not shared across workers).
+
+    Each conversation is a deque capped at MAX_HISTORY_MESSAGES, so appends
+    are O(1) and the oldest messages are evicted automatically.
+
+    Conversations expire CONVERSATION_TTL_SECONDS after their last append.
+    They are kept in append order, which is also expiry order, so expired
+    ones are purged from the front on each append.
+    """
+
+    def __init__(self):
+        self._conversations: "OrderedDict[str, Deque[Dict[str, str]]]" = OrderedDict()
+        self._contexts: Dict[str, str] = {}
+        self._expires_at: Dict[str, float] = {}
+
+    def _is_expired(self, conversation_id: str) -> bool:
+        expires_at = self._expires_at.get(conversation_id)
+        return expires_at is not None and expires_at <= time.monotonic()
+
+    def _purge_expired(self) -> None:
+        """Drop expired conversations (the oldest appends come first)."""
+        while self._conversations:
+            oldest = next(iter(self._conversations))
+            if not self._is_expired(oldest):
+                break
+            self._drop(oldest)
+
+    def _drop(self, conversation_id: str) -> bool:
+        self._contexts.pop(conversation_id, None)
+        self._expires_at.pop(conversation_id, None)
+        return self._conversations.pop(conversation_id, None) is not None
+
+    async def get_recent(self, conversation_id: str, count: int) -> List[Dict[str, str]]:
+        """Return the last `count` messages of a conversation."""
+        history = self._conversations.get(conversation_id)
+        if not history or self._is_expired(conversation_id):
+            return []
+        return list(islice(history, max(len(history) - count, 0), None))
+
+    async def get_context(self, conversation_id: str) -> Optional[str]:
+        """Return the pre-rendered context block, or None for a new conversation."""
+        if self._is_expired(conversation_id):
+            return None
+        return self._contexts.get(conversation_id)
+
+    async def append(self, conversation_id: str, messages: List[Dict[str, str]]) -> None:
+        """Append messages to a conversation, refresh its context block and TTL."""
+        self._purge_expired()
+
+        history = self._conversations.get(conversation_id)
+        if history is None:
+            history = self._conversations[conversation_id] = deque(maxlen=MAX_HISTORY_MESSAGES)
+        self._conversations.move_to_end(conversation_id)
+        self._expires_at[conversation_id] = time.monotonic() + CONVERSATION_TTL_SECONDS
+        history.extend(messages)
+        self._contexts[conversation_id] = format_context(
+            list(islice(history, max(len(history) - CONTEXT_MESSAGES, 0), None))
+        )
+
+    async def clear(self, conversation_id: str) -> bool:
+        """Delete a conversation. Returns True if it existed."""
+        return self._drop(conversation_id)
+
+
+class RedisConversationStore:
+    """Redis list per conversation with bounded length and TTL."""
+
+    def __init__(self, client: redis.Redis):
+        self._redis = client
+
+    @staticmethod
+    def _key(conversation_id: str) -> str:
+        return f"conv:{conversation_id}"
+
+    @staticmethod
+    def _context_key(conversation_id: str) -> str:
+        return f"conv:ctx:{conversation_id}"
+
+    async def get_recent(self, conversation_id: str, count: int) -> List[Dict[str, str]]:
+        """Return the last `count` messages of a conversation (O(count) LRANGE)."""
+        raw_messages = await self._redis.lrange(self._key(conversation_id), -count, -1)
+        return [orjson.loads(raw) for raw in raw_messages]
+
+    async def get_context(self, conversation_id: str) -> Optional[str]:
+        """Return the pre-rendered context block, or None for a new conversation."""
+        return await self._redis.get(self._context_key(conversation_id))
+
+    async def append(self, conversation_id: str, messages: List[Dict[str, str]]) -> None:
+        """Append messages, cap the list length, refresh the context block and TTL.
+
+        All commands go out in one MULTI/EXEC pipeline (a single atomic round trip).
+        """
+        key = self._key(conversation_id)
+        context_key = self._context_key(conversation_id)
+
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.rpush(key, *[orjson.dumps(msg) for msg in messages])
+        pipe.ltrim(key, -MAX_HISTORY_MESSAGES, -1)
+        pipe.expire(key, CONVERSATION_TTL_SECONDS)
+
+        # Messages are appended as user/assistant pairs, so the new tail is
+        # usually already in hand; only re-read it for shorter appends
+        if len(messages) >= CONTEXT_MESSAGES:
+            pipe.set(context_key, format_context(messages[-CONTEXT_MESSAGES:]), ex=CONVERSATION_TTL_SECONDS)
+            await pipe.execute()
+            return
+
+        pipe.lrange(key, -CONTEXT_MESSAGES, -1)
+        *_, raw_recent = await pipe.execute()
+        await self._redis.set(
+            context_key,
+            format_context([orjson.loads(raw) for raw in raw_recent]),
+            ex=CONVERSATION_TTL_SECONDS
+        )
+
+    async def clear(self, conversation_id: str) -> bool:
+        """Delete a conversation. Returns True if it existed."""
+        deleted = await self._redis.delete(
+            self._key(conversation_id),
+            self._context_key(conversation_id)
+        )
+        return deleted > 0
+
+
+def create_conversation_store():
+    """Create the conversation store configured by REDIS_URL.
+
+    Returns:
+        RedisConversationStore if REDIS_URL is set, otherwise InMemoryConversationStore
+    """
+    client = get_redis()
+    if client is not None:
+        return RedisConversationStore(client)
+    return InMemoryConversationStore()
+
+
+class InMemoryDocumentStore:
+    """Process-local document storage (not shared across workers).
+
+    Documents expire DOCUMENT_TTL_SECONDS after upload. Each write moves the
+    document to the back, so insertion order is expiry order and expired ones
+    are purged from the front on each upload.
+    """
+
+    def __init__(self):
+        self._documents: "OrderedDict[str, Tuple[DocumentContent, float]]" = OrderedDict()
+
+    async def get(self, file_id: str) -> Optional[DocumentContent]:
+        """Return a stored document, or None if unknown or expired."""
+        entry = self._documents.get(file_id)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+    async def set(self, doc: DocumentContent) -> None:
+        """Store a document under its file_id."""
+        now = time.monotonic()
+        while self._documents and next(iter(self._documents.values()))[1] <= now:
+            self._documents.popitem(last=False)
+        self._documents.pop(doc.file_id, None)
+        self._documents[doc.file_id] = (doc, now + DOCUMENT_TTL_SECONDS)
+
+
+class RedisDocumentStore:
+    """Documents in Redis: JSON metadata plus zlib-compressed full text."""
+
+    def __init__(self, client: redis.Redis):
+        # Binary client: compressed text is not valid UTF-8
+        self._redis = client
+
+    @staticmethod
+    def _meta_key(file_id: str) -> str:
+        return f"doc:meta:{file_id}"
+
+    @staticmethod
+    def _text_key(file_id: str) -> str:
+        return f"doc:text:{file_id}"
+
+    async def get(self, file_id: str) -> Optional[DocumentContent]:
+        """Return a stored document, or None if unknown or expired."""
+        meta, compressed_text = await self._redis.mget(
+            self._meta_key(file_id),
+            self._text_key(file_id)
+        )
+        if meta is None:
+            return None
+
+        doc = DocumentContent.model_validate_json(meta)
+        if compressed_text is not None:
+            doc.full_text = zlib.decompress(compressed_text).decode()
+        return doc
+
+    async def set(self, doc: DocumentContent) -> None:
+        """Store a document with DOCUMENT_TTL_SECONDS expiry."""
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.set(
+            self._meta_key(doc.file_id),
+            doc.model_dump_json(exclude={"full_text"}),
+            ex=DOCUMENT_TTL_SECONDS
+        )
+        if doc.full_text is not None:
+            pipe.set(
+                self._text_key(doc.file_id),
+                zlib.compress(doc.full_text.encode()),
+                ex=DOCUMENT_TTL_SECONDS
+            )
+        await pipe.execute()
+
+
+def create_document_store():
+    """Create the document store configured by REDIS_URL.
+
+    Returns:
+        RedisDocumentStore if REDIS_URL is set, otherwise InMemoryDocumentStore
+    """
+    client = get_redis(binary=True)
+    if client is not None:
+        return RedisDocumentStore(client)
+    return InMemoryDocumentStore()
+
+
+class InMemoryLinkedInSessionStore:
+    """Process-local LinkedIn sessions (not shared across workers).
+
+    Sessions expire with their access token; expired ones are dropped when
+    read, since LinkedIn logins are rare compared to the other stores.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, Tuple[Dict[str, str], float]] = {}
+
+    async def get(self, session_id: str) -> Optional[Dict[str, str]]:
+        """Return a session, or None if unknown or expired."""
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._sessions[session_id]
+            return None
+        return entry[0]
+
+    async def set(self, session_id: str, session: Dict[str, str], ttl_seconds: int) -> None:
+        """Store a session for ttl_seconds."""
+        self._sessions[session_id] = (session, time.monotonic() + ttl_seconds)
+
+    async def delete(self, session_id: str) -> None:
+        """Delete a session if it exists."""
+        self._sessions.pop(session_id, None)
+
+
+class RedisLinkedInSessionStore:
+    """LinkedIn sessions as JSON strings with the access token's TTL."""
+
+    def __init__(self, client: redis.Redis):
+        self._redis = client
+
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"linkedin:session:{session_id}"
+
+    async def get(self, session_id: str) -> Optional[Dict[str, str]]:
+        """Return a session, or None if unknown or expired."""
+        raw = await self._redis.get(self._key(session_id))
+        return orjson.loads(raw) if raw is not None else None
+
+    async def set(self, session_id: str, session: Dict[str, str], ttl_seconds: int) -> None:
+        """Store a session for ttl_seconds."""
+        await self._redis.set(self._key(session_id), orjson.dumps(session), ex=ttl_seconds)
+
+    async def delete(self, session_id: str) -> None:
+        """Delete a session if it exists."""
+        await self._redis.delete(self._key(session_id))
+
+
+def create_linkedin_session_store():
+    """Create the LinkedIn session store configured by REDIS_URL.
+
+    Returns:
+        RedisLinkedInSessionStore if REDIS_URL is set, otherwise InMemoryLinkedInSessionStore
+    """
+    client = get_redis()
+    if client is not None:
+        return RedisLinkedInSessionStore(client)
+    return InMemoryLinkedInSessionStore()
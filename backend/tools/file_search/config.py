@@ -15,6 +15,12 @@ CHUNK_SIZE_TOKENS = 1000
 CHUNK_OVERLAP_TOKENS = 100
 TOP_K_CHUNKS = 10
 
+# HNSW index settings (per-document collections hold at most ~150 chunks,
+# so ef_search above that makes every search exact at no real cost)
+HNSW_SPACE = "cosine"  # OpenAI embeddings are unit-normalized
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 200
+
 # Model settings
 EMBEDDING_MODEL = "text-embedding-3-small"
 LLM_MODEL = "gpt-4o-mini"
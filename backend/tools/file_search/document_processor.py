@@ -4,6 +4,9 @@ Document Processor - PDF extraction and validation
 Handles PDF text extraction, token counting, and validation.
 """
 
+from functools import lru_cache
+from typing import BinaryIO, Iterator, Tuple, Union
+
 import tiktoken
 from pypdf import PdfReader
 
@@ -15,24 +18,67 @@ from backend.tools.file_search.config import (
 )
 
 
-def extract_text_from_pdf(pdf_path: str) -> str:
+def iter_pdf_pages(pdf: Union[str, BinaryIO]) -> Iterator[str]:
+    """Yield the text of each PDF page that has any (pages are parsed lazily).
+
+    Args:
+        pdf: Path to PDF file, or a binary file-like object (e.g. BytesIO)
+
+    Yields:
+        Page text
+    """
+    reader = PdfReader(pdf)
+
+    for page in reader.pages:
+        text = page.extract_text()
+        if text:
+            yield text
+
+
+def extract_text_from_pdf(pdf: Union[str, BinaryIO]) -> str:
     """Extract all text from PDF file.
 
     Args:
-        pdf_path: Path to PDF file
+        pdf: Path to PDF file, or a binary file-like object (e.g. BytesIO)
 
     Returns:
         Extracted text as string
     """
-    reader = PdfReader(pdf_path)
+    return "\n\n".join(iter_pdf_pages(pdf))
+
+
+def extract_text_with_token_count(pdf: Union[str, BinaryIO]) -> Tuple[str, int]:
+    """Extract PDF text while counting tokens page by page.
+
+    Stops parsing as soon as the running count exceeds MAX_TOKEN_LIMIT, so
+    oversized documents are rejected without extracting the remaining pages.
+
+    Args:
+        pdf: Path to PDF file, or a binary file-like object (e.g. BytesIO)
+
+    Returns:
+        Tuple of (extracted text, token count)
+
+    Raises:
+        ValueError: If tokens exceed MAX_TOKEN_LIMIT
+    """
+    encoding = _get_encoding(LLM_MODEL)
     text_parts = []
+    token_count = 0
 
-    for page in reader.pages:
-        text = page.extract_text()
-        if text:
-            text_parts.append(text)
+    for text in iter_pdf_pages(pdf):
+        # +1 for the blank-line separator between pages
+        token_count += len(encoding.encode_ordinary(text)) + (1 if text_parts else 0)
+        validate_token_count(token_count)
+        text_parts.append(text)
+
+    return "\n\n".join(text_parts), token_count
 
-    return "\n\n".join(text_parts)
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str) -> tiktoken.Encoding:
+    """Return the tiktoken encoding for a model (resolved once per model)."""
+    return tiktoken.encoding_for_model(model)
 
 
 def count_tokens(text: str) -> int:
@@ -44,9 +90,7 @@ def count_tokens(text: str) -> int:
     Returns:
         Token count
     """
-    encoding = tiktoken.encoding_for_model(LLM_MODEL)
-    tokens = encoding.encode(text)
-    return len(tokens)
+    return len(_get_encoding(LLM_MODEL).encode_ordinary(text))
 
 
 def validate_file_size(size_bytes: int) -> None:
@@ -105,15 +149,20 @@ def truncate_text(text: str, max_tokens: int = 100_000, model: str = "gpt-4o-min
     Returns:
         Truncated text if exceeds limit, otherwise original text
     """
-    token_count = count_tokens(text)
+    # Every token covers at least one UTF-8 byte, so short text needs no encoding
+    if len(text) <= max_tokens and len(text.encode()) <= max_tokens:
+        return text
+    
+    # Encode once: the same tokens are used for the length check and the cut.
+    # encode_ordinary treats text like "<|endoftext|>" in scraped pages as
+    # plain text instead of raising on special tokens.
+    encoding = _get_encoding(model)
+    tokens = encoding.encode_ordinary(text)
     
-    if token_count <= max_tokens:
+    if len(tokens) <= max_tokens:
         return text
     
     # Truncate tokens and decode back to text
-    encoding = tiktoken.encoding_for_model(model)
-    tokens = encoding.encode(text)
-    truncated_tokens = tokens[:max_tokens]
-    truncated_text = encoding.decode(truncated_tokens)
+    truncated_text = encoding.decode(tokens[:max_tokens])
     
     return truncated_text + "\n\n[Content truncated to fit token limit]"
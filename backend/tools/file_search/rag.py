@@ -18,7 +18,10 @@ from backend.tools.file_search.config import (
     LLM_MODEL,
     CHUNK_SIZE_TOKENS,
     CHUNK_OVERLAP_TOKENS,
-    TOP_K_CHUNKS
+    TOP_K_CHUNKS,
+    HNSW_SPACE,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH
 )
 
 # Load environment variables
@@ -80,17 +83,28 @@ def create_vector_store(file_id: str, text: str) -> str:
     # Split into chunks
     chunks = chunk_text(text)
 
-    # Create ChromaDB collection
-    collection = chroma_client.create_collection(
+    # Create ChromaDB collection (file_id is a content hash, so a re-upload of
+    # a document whose metadata expired finds its collection already indexed)
+    collection = chroma_client.get_or_create_collection(
         name=file_id,
-        embedding_function=openai_ef
+        embedding_function=openai_ef,
+        configuration={
+            "hnsw": {
+                "space": HNSW_SPACE,
+                "ef_construction": HNSW_EF_CONSTRUCTION,
+                "ef_search": HNSW_EF_SEARCH
+            }
+        }
     )
 
+    if collection.count() == len(chunks):
+        return file_id
+
     # Add chunks with metadata
     ids = [f"{file_id}_chunk_{i}" for i in range(len(chunks))]
     metadatas = [{"chunk_index": i} for i in range(len(chunks))]
 
-    collection.add(
+    collection.upsert(
         documents=chunks,
         ids=ids,
         metadatas=metadatas
@@ -144,20 +158,19 @@ def retrieve_chunks(file_id: str, user_query: str) -> str:
     # Expand query
     queries = expand_query(user_query)
 
-    # Retrieve chunks for each query variation
+    # Retrieve chunks for all query variations in one call (one embedding request)
+    results = collection.query(
+        query_texts=queries,
+        n_results=min(TOP_K_CHUNKS, collection.count())
+    )
+
+    # Deduplicate and store chunks
     seen_chunks = {}
 
-    for query in queries:
-        results = collection.query(
-            query_texts=[query],
-            n_results=TOP_K_CHUNKS
-        )
-
-        # Deduplicate and store chunks
-        if results["ids"] and results["documents"]:
-            for chunk_id, chunk_text in zip(results["ids"][0], results["documents"][0]):
-                if chunk_id not in seen_chunks:
-                    seen_chunks[chunk_id] = chunk_text
+    for ids, documents in zip(results["ids"] or [], results["documents"] or []):
+        for chunk_id, chunk_text in zip(ids, documents):
+            if chunk_id not in seen_chunks:
+                seen_chunks[chunk_id] = chunk_text
 
     # Sort by chunk index to maintain document order
     sorted_chunks = sorted(
@@ -5,6 +5,8 @@ Searches uploaded documents and retrieves relevant content
 based on user's topic query.
 """
 
+import asyncio
+
 from agents import function_tool
 
 from backend.tools.file_search.rag import retrieve_chunks
@@ -19,8 +21,7 @@ def set_document_store(store):
     document_store = store
 
 
-@function_tool
-async def file_search(file_id: str, topic_query: str) -> str:
+async def search_document(file_id: str, topic_query: str) -> str:
     """Search uploaded document for content about a specific topic.
 
     Use this when user has uploaded a PDF and wants to create a LinkedIn
@@ -33,11 +34,10 @@ async def file_search(file_id: str, topic_query: str) -> str:
     Returns:
         Relevant document content (full text or retrieved chunks)
     """
-    if not document_store or file_id not in document_store:
+    doc = await document_store.get(file_id) if document_store else None
+    if doc is None:
         raise ValueError("Document not found. Please upload a document first.")
 
-    doc = document_store[file_id]
-
     # Tier 1: Direct extraction (≤80k tokens)
     if doc.tier == "direct":
         return f"""Document: {doc.filename}
@@ -49,7 +49,9 @@ Full document content:
 Create a LinkedIn post focusing on: {topic_query}"""
 
     # Tier 2: RAG retrieval (>80k tokens)
-    relevant_content = retrieve_chunks(
+    # Query expansion and Chroma queries use blocking clients; keep them off the event loop
+    relevant_content = await asyncio.to_thread(
+        retrieve_chunks,
         file_id=doc.vector_store_id,
         user_query=topic_query
     )
@@ -61,3 +63,7 @@ Relevant sections retrieved using semantic search:
 {relevant_content}
 
 Create a LinkedIn post focusing on: {topic_query}"""
+
+
+# Agent tool; main.py also calls search_document directly for [file_id: ...] queries
+file_search = function_tool(search_document, name_override="file_search")
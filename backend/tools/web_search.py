@@ -7,20 +7,48 @@ combines results, and deduplicates by URL.
 Uses OpenAI Agents SDK @function_tool decorator and Pydantic for validation.
 """
 
+import asyncio
 import os
-from typing import List
-from exa_py import Exa
-from tavily import TavilyClient
+import re
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+import httpx
+from exa_py import AsyncExa
 from agents import function_tool
 
+from backend.http_client import get_http_client
 from backend.models.schema import SearchResult
 
 # Maximum characters per search result to prevent context overflow
 MAX_CONTENT_LENGTH = 4000
 
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+EXA_BASE_URL = "https://api.exa.ai"
 
-@function_tool
-async def web_search(query: str) -> List[SearchResult]:
+# Query parameters that only track the click and never change the page
+TRACKING_PARAMS = frozenset({"fbclid", "gclid", "ref", "ref_src", "mc_cid", "mc_eid"})
+
+# Cheap pre-check so query strings without tracking parameters skip parsing
+TRACKING_PARAM_PATTERN = re.compile(
+    r"(?:^|&)(?:utm_|(?:" + "|".join(sorted(TRACKING_PARAMS)) + r")(?:=|&|$))",
+    re.IGNORECASE
+)
+
+
+class _PooledExa(AsyncExa):
+    """AsyncExa that sends its requests through the shared HTTP/2 pool."""
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return get_http_client()
+
+
+# API credentials and Exa client (created lazily on first search, then reused)
+_tavily_key: Optional[str] = None
+_exa_client: Optional[_PooledExa] = None
+
+
+async def search_web(query: str) -> List[SearchResult]:
     """Search the web for current information on any topic.
     
     Use this for general research, trends, news, articles, or any non-video content.
@@ -32,19 +60,13 @@ async def web_search(query: str) -> List[SearchResult]:
     Returns:
         List of SearchResult objects with title, URL, content, and source
     """
-    # Initialize API clients
-    tavily_key = os.getenv("TAVILY_KEY")
-    exa_key = os.getenv("EXA_KEY")
-    
-    if not tavily_key or not exa_key:
-        raise ValueError("TAVILY_KEY and EXA_KEY must be set")
-    
-    tavily_client = TavilyClient(api_key=tavily_key)
-    exa_client = Exa(api_key=exa_key)
+    tavily_key, exa_client = _get_clients()
     
-    # Execute searches
-    tavily_results = await _search_tavily(tavily_client, query)
-    exa_results = await _search_exa(exa_client, query)
+    # Execute both searches concurrently (wall time ≈ slowest provider)
+    tavily_results, exa_results = await asyncio.gather(
+        _search_tavily(tavily_key, query),
+        _search_exa(exa_client, query)
+    )
     
     # Combine and deduplicate by URL
     all_results = tavily_results + exa_results
@@ -54,17 +76,51 @@ async def web_search(query: str) -> List[SearchResult]:
     return deduplicated
 
 
-async def _search_tavily(client: TavilyClient, query: str) -> List[SearchResult]:
-    """Search via Tavily API with Pydantic validation."""
+# Agent tool; main.py also calls search_web directly for first-turn topics
+web_search = function_tool(search_web, name_override="web_search")
+
+
+def _get_clients() -> Tuple[str, AsyncExa]:
+    """Return the Tavily API key and shared Exa client, loading them on first use.
+    
+    Both providers are called through the shared HTTP/2 pool, so TCP/TLS
+    sessions to api.tavily.com and api.exa.ai survive between searches.
+    """
+    global _tavily_key, _exa_client
+    
+    if _tavily_key is None or _exa_client is None:
+        tavily_key = os.getenv("TAVILY_KEY")
+        exa_key = os.getenv("EXA_KEY")
+        
+        if not tavily_key or not exa_key:
+            raise ValueError("TAVILY_KEY and EXA_KEY must be set")
+        
+        _tavily_key = tavily_key
+        _exa_client = _PooledExa(api_key=exa_key)
+    
+    return _tavily_key, _exa_client
+
+
+async def _search_tavily(api_key: str, query: str) -> List[SearchResult]:
+    """Search via Tavily REST API with Pydantic validation.
+    
+    Calls the endpoint directly because the Tavily SDK opens (and closes)
+    a new HTTP client for every request.
+    """
     try:
-        response = client.search(
-            query=query,
-            max_results=3,
-            search_depth="basic",  # Faster, more focused results
-            include_answer=False,  # We only need search results
-            include_raw_content=True  # Get full article content
+        response = await get_http_client().post(
+            TAVILY_SEARCH_URL,
+            json={
+                "query": query,
+                "max_results": 3,
+                "search_depth": "basic",  # Faster, more focused results
+                "include_answer": False,  # We only need search results
+                "include_raw_content": True  # Get full article content
+            },
+            headers={"Authorization": f"Bearer {api_key}"}
         )
-        raw_results = response.get("results", [])
+        response.raise_for_status()
+        raw_results = response.json().get("results", [])
         
         if not raw_results:
             return []
@@ -94,10 +150,10 @@ async def _search_tavily(client: TavilyClient, query: str) -> List[SearchResult]
         return []
 
 
-async def _search_exa(client: Exa, query: str) -> List[SearchResult]:
+async def _search_exa(client: AsyncExa, query: str) -> List[SearchResult]:
     """Search via Exa API with Pydantic validation."""
     try:
-        response = client.search_and_contents(
+        response = await client.search_and_contents(
             query=query,
             num_results=3,
             text=True,  # Get full text content without character limit
@@ -133,18 +189,55 @@ async def _search_exa(client: Exa, query: str) -> List[SearchResult]:
 
 
 def _deduplicate_by_url(results: List[SearchResult]) -> List[SearchResult]:
-    """Remove duplicate results based on URL - keeps first occurrence."""
+    """Remove duplicate results based on canonical URL - keeps first occurrence."""
     seen_urls = set()
     deduplicated = []
     
     for result in results:
-        if result.url not in seen_urls:
-            seen_urls.add(result.url)
+        url_key = _canonicalize_url(result.url)
+        if url_key not in seen_urls:
+            seen_urls.add(url_key)
             deduplicated.append(result)
     
     return deduplicated
 
 
+def _canonicalize_url(url: str) -> str:
+    """Normalize a URL so Tavily and Exa links to the same page compare equal.
+    
+    Ignores scheme, case of the host, a leading "www.", trailing slashes,
+    fragments and tracking parameters (utm_*, fbclid, ref, ...).
+    
+    Args:
+        url: Result URL as returned by the search API
+        
+    Returns:
+        Canonical key for deduplication (not a fetchable URL)
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    
+    path = parts.path.rstrip("/")
+    
+    query = parts.query
+    if query and TRACKING_PARAM_PATTERN.search(query):
+        # Filter raw "key=value" pairs so kept parameters stay byte-identical
+        query = "&".join(
+            param for param in query.split("&")
+            if param and not _is_tracking_param(param.split("=", 1)[0])
+        )
+    
+    return f"{host}{path}?{query}" if query else f"{host}{path}"
+
+
+def _is_tracking_param(key: str) -> bool:
+    """Check whether a query parameter name is a tracking parameter."""
+    key = key.lower()
+    return key.startswith("utm_") or key in TRACKING_PARAMS
+
+
 def _truncate_content(content: str, max_length: int = MAX_CONTENT_LENGTH) -> str:
     """Truncate content to prevent context overflow.
     
@@ -7,14 +7,18 @@ using local Whisper model. Enforces 15-minute duration limit.
 Uses OpenAI Agents SDK @function_tool decorator.
 """
 
+import asyncio
 import os
+import tempfile
+from pathlib import Path
+
 import certifi
 
 import yt_dlp
-from openai import OpenAI
 from agents import function_tool
 from pydantic import ValidationError
 
+from backend.http_client import get_openai_client
 from backend.models.schema import YouTubeContent
 
 
@@ -25,8 +29,19 @@ os.environ['SSL_CERT_FILE'] = certifi.where()
 os.environ['REQUESTS_CA_BUNDLE'] = certifi.where()
 
 
-@function_tool
-async def youtube_transcribe(video_url: str) -> YouTubeContent:
+def _extract_info(video_url: str) -> dict:
+    """Fetch video metadata without downloading (blocking)."""
+    with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+        return ydl.extract_info(video_url, download=False)
+
+
+def _download(video_url: str, download_opts: dict) -> None:
+    """Download a video's audio with the given yt-dlp options (blocking)."""
+    with yt_dlp.YoutubeDL(download_opts) as ydl:
+        ydl.download([video_url])
+
+
+async def transcribe_video(video_url: str) -> YouTubeContent:
     """Transcribe and analyze a YouTube video using local Whisper model.
     
     Use this when user provides a YouTube URL or asks to analyze/summarize a video.
@@ -39,10 +54,13 @@ async def youtube_transcribe(video_url: str) -> YouTubeContent:
     Returns:
         YouTubeContent object with video metadata and transcript
     """
-    # Get metadata once (no download)
-    ydl_opts = {'quiet': True, 'no_warnings': True}
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(video_url, download=False)
+    # Get metadata once (no download); yt-dlp blocks, so it runs in a thread
+    try:
+        info = await asyncio.to_thread(_extract_info, video_url)
+    except yt_dlp.utils.DownloadError as exc:
+        raise ValueError(
+            "Unable to access this video. Please check the URL and that the video is public."
+        ) from exc
     
     duration = info.get('duration', 0)
     
@@ -61,36 +79,37 @@ async def youtube_transcribe(video_url: str) -> YouTubeContent:
     if not title:
         raise ValueError("Video metadata missing title")
     
-    # Download audio
-    audio_path = "audio_file.mp3"
-    download_opts = {
-        'format': 'bestaudio/best',
-        'postprocessors': [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '192',
-        }],
-        'outtmpl': 'audio_file',
-        'quiet': True,
-        'no_warnings': True,
-    }
-    
-    try:
-        with yt_dlp.YoutubeDL(download_opts) as ydl:
-            ydl.download([video_url])
-        
-        # Transcribe with OpenAI Whisper API (much faster than local)
-        openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        with open(audio_path, "rb") as audio_file:
-            transcription = openai_client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file
-            )
-        transcript = transcription.text.strip()
+    # Download audio into a per-call temp dir (removed on exit, even on errors),
+    # so concurrent transcriptions never share a file
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        audio_path = Path(tmp_dir) / "audio_file.mp3"
+        download_opts = {
+            'format': 'bestaudio/best',
+            'postprocessors': [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'mp3',
+                'preferredquality': '192',
+            }],
+            'outtmpl': str(Path(tmp_dir) / "audio_file"),
+            'quiet': True,
+            'no_warnings': True,
+        }
         
-        if not transcript:
-            raise ValueError("Transcription produced empty text")
+        await asyncio.to_thread(_download, video_url, download_opts)
         
+        # Transcribe with OpenAI Whisper API (much faster than local);
+        # a Path is read asynchronously by the client
+        transcription = await get_openai_client().audio.transcriptions.create(
+            model="whisper-1",
+            file=audio_path
+        )
+    
+    transcript = transcription.text.strip()
+    
+    if not transcript:
+        raise ValueError("Transcription produced empty text")
+    
+    try:
         # Validate with Pydantic schema
         youtube_content = YouTubeContent.model_validate({
             "video_url": video_url,
@@ -99,11 +118,11 @@ async def youtube_transcribe(video_url: str) -> YouTubeContent:
             "duration_seconds": duration,
             "transcript": transcript,
         })
-        
-        return youtube_content
-        
     except ValidationError as exc:
         raise ValueError(f"Invalid YouTube content: {exc}") from exc
-    finally:
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
+    
+    return youtube_content
+
+
+# Agent tool; main.py also calls transcribe_video directly for plain YouTube URLs
+youtube_transcribe = function_tool(transcribe_video, name_override="youtube_transcribe")
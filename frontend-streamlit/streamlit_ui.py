@@ -13,7 +13,8 @@ Features:
 """
 
 import asyncio
-from typing import Optional
+import json
+from typing import Callable, Optional
 
 import httpx
 import streamlit as st
@@ -46,20 +47,49 @@ for message in st.session_state.messages:
         st.markdown(message["content"])
 
 
-async def generate_linkedin_post(query: str, conversation_id: Optional[str] = None) -> Optional[dict]:
-    """Call backend API to generate LinkedIn post from query."""
+async def generate_linkedin_post(
+    query: str,
+    conversation_id: Optional[str] = None,
+    on_partial: Optional[Callable[[dict], None]] = None
+) -> Optional[dict]:
+    """Call backend streaming API to generate LinkedIn post from query.
+    
+    Partial posts are passed to on_partial as they arrive; the final
+    response (same shape as /api/generate-post) is returned.
+    """
     async with httpx.AsyncClient(timeout=120.0) as client:
         try:
             payload = {"query": query}
             if conversation_id:
                 payload["conversation_id"] = conversation_id
             
-            response = await client.post(
-                f"{API_URL}/api/generate-post",
+            async with client.stream(
+                "POST",
+                f"{API_URL}/api/generate-post/stream",
                 json=payload
-            )
-            response.raise_for_status()
-            return response.json()
+            ) as response:
+                if response.is_error:
+                    await response.aread()
+                response.raise_for_status()
+                
+                event = None
+                async for line in response.aiter_lines():
+                    if line.startswith("event:"):
+                        event = line[len("event:"):].strip()
+                    elif line.startswith("data:"):
+                        data = json.loads(line[len("data:"):])
+                        if event == "done":
+                            return data
+                        if event == "error":
+                            st.error(data["detail"])
+                            return None
+                        if on_partial:
+                            on_partial(data)
+                    elif not line:
+                        event = None
+            
+            st.error("Connection closed before the post was complete. Please try again.")
+            return None
         except httpx.HTTPStatusError as e:
             error_detail = e.response.json().get("detail", e.response.text) if e.response.headers.get("content-type") == "application/json" else e.response.text
             
@@ -135,15 +165,20 @@ if prompt := st.chat_input(input_placeholder):
     
     with st.chat_message("assistant"):
         spinner_text = "📄 Analyzing document and generating LinkedIn post..." if st.session_state.uploaded_file_id else "🔍 Researching topic and generating LinkedIn post..."
+        post_placeholder = st.empty()
         with st.spinner(spinner_text):
-            result = asyncio.run(generate_linkedin_post(query, st.session_state.conversation_id))
+            result = asyncio.run(generate_linkedin_post(
+                query,
+                st.session_state.conversation_id,
+                on_partial=lambda partial: post_placeholder.markdown(partial.get("content", ""))
+            ))
             
             if result:
                 # Store conversation ID
                 st.session_state.conversation_id = result.get("conversation_id")
                 
                 linkedin_post = format_post_output(result)
-                st.markdown(linkedin_post)
+                post_placeholder.markdown(linkedin_post)
                 
                 st.session_state.messages.append({
                     "role": "assistant",
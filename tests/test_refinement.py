@@ -0,0 +1,129 @@
+"""
+Regression tests for the refinement fast path.
+
+Follow-ups that only restyle the previous post skip the research agent;
+new topics that happen to contain a style word must still be researched.
+
+Run with: python -m unittest discover tests
+"""
+
+import os
+import unittest
+from unittest import mock
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("LOGFIRE_SEND_TO_LOGFIRE", "false")
+os.environ.setdefault("LOGFIRE_CONSOLE", "false")
+
+from backend import main  # noqa: E402
+
+
+REFINEMENTS = [
+    "make it shorter",
+    "Please make it more professional",
+    "Shorten it",
+    "rewrite this with a stronger hook",
+    "Rephrase.",
+    "Can you change the tone to casual",
+    "keep it under 150 words",
+    "remove the emojis",
+    "Take out all the hashtags",
+    "add more stats",
+    "Add a call to action",
+    "use fewer emojis",
+    "Remove the hashtags from the post",
+    "add more examples to it please",
+    "[file_id: abc123] make it punchier",
+]
+
+TOPIC_QUERIES = [
+    "How to remove bias from hiring",
+    "How AI tools improve developer productivity",
+    "Why hashtags matter for small business marketing",
+    "Fewer meetings, better teams",
+    "Professional tone in customer emails",
+    "Rewriting legacy code without breaking production",
+    "Use data to drive decisions",
+    "[file_id: abc123] how to improve onboarding",
+    "[file_id: abc123] remove bottlenecks in the approval process",
+    "Remove jargon from your resume",
+    "Add humor to your presentations",
+    "Use more examples in technical interviews",
+    "Add examples of good onboarding",
+    "Make it count: lessons from a failed startup",
+    "Keep it simple: design principles for APIs",
+]
+
+
+class RefinementRoutingTest(unittest.IsolatedAsyncioTestCase):
+    """_get_refinement_history only returns history for refinement requests."""
+
+    async def asyncSetUp(self):
+        self.conversation_id = "refinement-test"
+        await main.conversation_store.append(self.conversation_id, [
+            {"role": "user", "content": "AI trends in healthcare"},
+            {"role": "assistant", "content": "Previous post\n\nAI Healthcare Innovation"}
+        ])
+
+    async def test_refinements_reuse_previous_post(self):
+        for query in REFINEMENTS:
+            with self.subTest(query=query):
+                history = await main._get_refinement_history(query, self.conversation_id)
+                self.assertIsNotNone(history)
+                self.assertEqual(history[-1]["role"], "assistant")
+
+    async def test_topic_queries_go_to_the_agent(self):
+        for query in TOPIC_QUERIES:
+            with self.subTest(query=query):
+                self.assertIsNone(await main._get_refinement_history(query, self.conversation_id))
+
+    async def test_refinement_without_previous_post_goes_to_the_agent(self):
+        self.assertIsNone(await main._get_refinement_history("make it shorter", "new-conversation"))
+
+
+# Document follow-ups the refinement pattern leaves to the agent; they must
+# not be routed straight to file_search while a post exists
+DOCUMENT_FOLLOW_UPS = [
+    "[file_id: abc] shorter",
+    "[file_id: abc] less formal",
+    "[file_id: abc] more casual please",
+    "[file_id: abc] make the hook punchier",
+]
+
+
+class FollowUpRoutingTest(unittest.IsolatedAsyncioTestCase):
+    """Direct tool fast paths only apply to the first message of a conversation."""
+
+    async def asyncSetUp(self):
+        self.conversation_id = "routing-test"
+        await main.conversation_store.append(self.conversation_id, [
+            {"role": "user", "content": "[file_id: abc] onboarding"},
+            {"role": "assistant", "content": "Previous post\n\nOnboarding HR Culture"}
+        ])
+        patches = [
+            mock.patch.object(main, "_run_research_agent", mock.AsyncMock(return_value=("refined", None))),
+            mock.patch.object(main, "search_document", mock.AsyncMock(return_value="document text")),
+            mock.patch.object(main, "truncate_text", lambda text, max_tokens: text),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def test_document_follow_ups_go_to_the_agent(self):
+        for query in DOCUMENT_FOLLOW_UPS:
+            with self.subTest(query=query):
+                main._run_research_agent.reset_mock()
+                research = await main._run_research(query, self.conversation_id)
+                main._run_research_agent.assert_awaited_once()
+                self.assertIn("Previous conversation:", main._run_research_agent.await_args.args[0])
+                self.assertNotEqual(research.tool_used, "file_search")
+        main.search_document.assert_not_awaited()
+
+    async def test_first_document_message_calls_file_search_directly(self):
+        research = await main._run_research("[file_id: abc] onboarding tips", "new-document-conversation")
+        self.assertEqual(research.tool_used, "file_search")
+        main._run_research_agent.assert_not_awaited()
+
+
+if __name__ == "__main__":
+    unittest.main()